@@ -0,0 +1,104 @@
+"""Upstream search and email backends used by the workers.
+
+Workers talk to SerpAPI and SendGrid through these small interfaces so the
+backends can be swapped for offline stand-ins (see ``agent.fakes``). The
+vendor SDKs are imported on first call, keeping them off the import path.
+"""
+
+import os
+from typing import Any, Protocol
+
+
+class SearchBackend(Protocol):
+    """Web search used by the search worker."""
+
+    configured: bool
+
+    def search(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Run one search and return the raw SerpAPI-style response."""
+        ...
+
+
+class EmailBackend(Protocol):
+    """Outgoing email used by the email worker."""
+
+    configured: bool
+
+    def send(self, to: str, subject: str, body: str) -> int:
+        """Send one plain-text email and return the HTTP status code."""
+        ...
+
+
+class SerpApiSearchBackend:
+    """Google search through SerpAPI."""
+
+    def __init__(self, api_key: str) -> None:
+        """Use ``api_key``; an empty key leaves the backend unconfigured."""
+        self.api_key = api_key
+        self.configured = bool(api_key)
+
+    def search(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Run one SerpAPI Google search."""
+        from serpapi import GoogleSearch
+
+        result: dict[str, Any] = GoogleSearch({**params, "api_key": self.api_key}).get_dict()
+        return result
+
+
+class SendGridEmailBackend:
+    """Plain-text email through the SendGrid API."""
+
+    def __init__(self, api_key: str, from_email: str) -> None:
+        """Send as ``from_email``; an empty key leaves the backend unconfigured."""
+        self.api_key = api_key
+        self.from_email = from_email
+        self.configured = bool(api_key)
+
+    def send(self, to: str, subject: str, body: str) -> int:
+        """Send one plain-text email through SendGrid."""
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail
+
+        message = Mail(
+            from_email=self.from_email,
+            to_emails=to,
+            subject=subject,
+            plain_text_content=body,
+        )
+        response = SendGridAPIClient(self.api_key).send(message)
+        return int(response.status_code)
+
+
+_search_backend: SearchBackend | None = None
+_email_backend: EmailBackend | None = None
+
+
+def get_search_backend() -> SearchBackend:
+    """Return the active search backend (SerpAPI unless replaced)."""
+    global _search_backend
+    if _search_backend is None:
+        _search_backend = SerpApiSearchBackend(os.getenv("SERPAPI_KEY", ""))
+    return _search_backend
+
+
+def get_email_backend() -> EmailBackend:
+    """Return the active email backend (SendGrid unless replaced)."""
+    global _email_backend
+    if _email_backend is None:
+        _email_backend = SendGridEmailBackend(
+            os.getenv("SENDGRID_API_KEY", ""),
+            os.getenv("SENDGRID_FROM_EMAIL", "noreply@example.com"),
+        )
+    return _email_backend
+
+
+def set_search_backend(backend: SearchBackend | None) -> None:
+    """Replace the search backend; ``None`` restores the default."""
+    global _search_backend
+    _search_backend = backend
+
+
+def set_email_backend(backend: EmailBackend | None) -> None:
+    """Replace the email backend; ``None`` restores the default."""
+    global _email_backend
+    _email_backend = backend
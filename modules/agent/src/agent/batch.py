@@ -0,0 +1,243 @@
+"""Offline batch processing for bulk prompt workloads.
+
+Runs JSONL requests through the same frontline → orchestrator pipeline as
+chat, with bounded concurrency, and streams JSONL results as they complete.
+Each input line is ``{"id": ..., "message": ..., "history": [...]}``, where
+``id`` and ``history`` are optional. Each output line is a ``BatchResult``.
+
+Identical requests (same history and message) within one batch share one
+pipeline run; the last ``DEDUP_CACHE_SIZE`` distinct requests are remembered.
+The CLI streams its input, appends to its output file and, on restart, skips
+ids already present there, so the output doubles as the checkpoint::
+
+    agent-batch requests.jsonl -o results.jsonl --concurrency 16
+
+The server exposes the same thing as ``POST /batch``. There all batches share
+``AGENT_BATCH_CONCURRENCY`` slots so bulk work cannot crowd out chat.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+from agent.conversation import Conversation
+from agent.frontline import process as frontline_process
+from agent.metrics import stage
+from agent.orchestrator import process as orchestrator_process
+
+logger = logging.getLogger(__name__)
+
+SERVER_BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "4"))
+DEDUP_CACHE_SIZE = 10_000
+
+_server_slots: asyncio.Semaphore | None = None
+
+
+class BatchRequest(BaseModel):
+    """One line of batch input."""
+
+    # Nightly jobs often number their lines; accept {"id": 7} as "7"
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    id: str = Field(description="Caller-supplied identifier, echoed in the result")
+    message: str = Field(description="User message to process")
+    history: list[dict[str, str]] = Field(default_factory=list, description="Prior conversation messages")
+
+
+class BatchResult(BaseModel):
+    """One line of batch output."""
+
+    id: str = Field(description="Identifier of the request")
+    routed: bool = Field(default=False, description="Whether the orchestrator handled it")
+    response: str = Field(default="", description="Final response text")
+    error: str | None = Field(default=None, description="Error message if processing failed")
+    elapsed_ms: float = Field(default=0.0, description="Processing time for this request")
+
+
+def parse_requests(lines: Iterable[str]) -> Iterator[BatchRequest]:
+    """Parse JSONL lines into requests; ids default to the line number.
+
+    Raises:
+        ValueError: On a malformed line, naming its line number
+    """
+    for lineno, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+            raw.setdefault("id", str(lineno))
+            yield BatchRequest.model_validate(raw)
+        except (json.JSONDecodeError, ValidationError, AttributeError) as e:
+            raise ValueError(f"line {lineno}: {e}") from e
+
+
+async def _pipeline(request: BatchRequest) -> tuple[bool, str]:
+    conversation = Conversation(request.history)
+    conversation.append("user", request.message)
+
+    with stage("frontline"):
+        should_route, result = await frontline_process(request.message, conversation)
+    if not should_route:
+        return False, result
+    return True, await orchestrator_process(request.message, conversation)
+
+
+async def _process(
+    request: BatchRequest,
+    cache: dict[str, asyncio.Task[tuple[bool, str]]],
+    limiter: asyncio.Semaphore | None,
+) -> BatchResult:
+    start = time.perf_counter()
+    key = json.dumps([request.history, request.message], sort_keys=True)
+    try:
+        task = cache.get(key)
+        if task is None:
+            task = cache[key] = asyncio.create_task(_limited(request, limiter))
+            # Bound memory on long streamed inputs: forget the oldest finished run
+            oldest = next(iter(cache))
+            if len(cache) > DEDUP_CACHE_SIZE and cache[oldest].done():
+                del cache[oldest]
+        routed, response = await asyncio.shield(task)
+        result = BatchResult(id=request.id, routed=routed, response=response)
+    except Exception as e:
+        logger.exception(f"Batch request {request.id} failed: {e}")
+        result = BatchResult(id=request.id, error=str(e))
+    result.elapsed_ms = round((time.perf_counter() - start) * 1e3, 1)
+    return result
+
+
+async def _limited(request: BatchRequest, limiter: asyncio.Semaphore | None) -> tuple[bool, str]:
+    if limiter is None:
+        return await _pipeline(request)
+    async with limiter:
+        return await _pipeline(request)
+
+
+async def run_batch(
+    requests: Iterable[BatchRequest],
+    concurrency: int = 8,
+    limiter: asyncio.Semaphore | None = None,
+) -> AsyncIterator[BatchResult]:
+    """Process requests with bounded concurrency, yielding results as they finish.
+
+    Args:
+        requests: Requests to process (consumed lazily)
+        concurrency: Requests in flight at once for this batch
+        limiter: Optional semaphore shared with other batches
+
+    Yields:
+        One BatchResult per request, in completion order
+    """
+    pending = iter(requests)
+    results: asyncio.Queue[BatchResult | Exception | None] = asyncio.Queue()
+    cache: dict[str, asyncio.Task[tuple[bool, str]]] = {}
+
+    async def worker() -> None:
+        try:
+            for request in pending:
+                await results.put(await _process(request, cache, limiter))
+        except Exception as e:
+            await results.put(e)  # e.g. a malformed line in a lazily parsed input
+        finally:
+            await results.put(None)
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    running = len(workers)
+    try:
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+                continue
+            if isinstance(result, Exception):
+                raise result
+            yield result
+    finally:
+        # Pipelines are shielded from their callers; on an early exit (e.g. the
+        # /batch client disconnected) cancel them too, freeing the shared slots
+        for task in [*workers, *cache.values()]:
+            task.cancel()
+
+
+def server_limiter() -> asyncio.Semaphore:
+    """Return the process-wide slots shared by every ``POST /batch``."""
+    global _server_slots
+    if _server_slots is None:
+        _server_slots = asyncio.Semaphore(SERVER_BATCH_CONCURRENCY)
+    return _server_slots
+
+
+def completed_ids(path: Path) -> set[str]:
+    """Return ids already written to an output file (the checkpoint)."""
+    if not path.exists():
+        return set()
+    done = set()
+    with path.open() as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (json.JSONDecodeError, KeyError):
+                continue  # torn last line from a crash; it will be redone
+    return done
+
+
+async def run_file(input_path: Path, output_path: Path, concurrency: int) -> int:
+    """Process a JSONL file into a JSONL output, resuming from the output.
+
+    The input is read line by line as workers free up, so it can be larger
+    than memory.
+
+    Returns:
+        Number of requests processed in this invocation
+
+    Raises:
+        ValueError: On a malformed input line; results before it are kept
+    """
+    done = completed_ids(output_path)
+    if done:
+        logger.warning(f"Resuming batch: skipping {len(done)} requests already done")
+
+    count = 0
+    with input_path.open() as source, output_path.open("a+") as out:
+        requests = (r for r in parse_requests(source) if r.id not in done)
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")  # terminate a torn line so new results start clean
+        async for result in run_batch(requests, concurrency):
+            out.write(result.model_dump_json() + "\n")
+            out.flush()
+            count += 1
+    return count
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command-line entry point."""
+    # Importing the runner applies AGENT_OFFLINE / AGENT_CASSETTE_MODE, as for the server
+    import agent.runner  # noqa: F401
+    from agent.logging_config import configure_logging
+    from agent.templates import check_and_log
+
+    parser = argparse.ArgumentParser(description="Run a JSONL file of requests through the agent pipeline.")
+    parser.add_argument("input", type=Path, help="JSONL requests")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL results (appended; also the checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--log-level", default="WARNING", help="Logging level")
+    args = parser.parse_args(argv)
+
+    configure_logging(getattr(logging, args.log_level.upper()))
+    check_and_log()
+    start = time.perf_counter()
+    count = asyncio.run(run_file(args.input, args.output, args.concurrency))
+    logger.warning(f"Processed {count} requests in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
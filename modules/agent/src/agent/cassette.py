@@ -0,0 +1,467 @@
+"""Record/replay cassettes for model, search and email calls.
+
+In ``record`` mode every upstream call (one model response per agent turn,
+each search and each email send) is written to an on-disk cassette together
+with its observed latency. In ``replay`` mode the same calls are answered
+from the cassette, optionally with the original timing, so a pipeline change
+can be A/B tested on an identical workload without touching the network.
+
+Calls are matched by a fingerprint of their inputs. Repeated identical
+calls are replayed in recorded order. A call with no recording raises
+``CassetteMiss``.
+
+The store is one file per call kind (``model``, ``search``, ``email``). Each
+entry is a separate gzip member, so a crash never corrupts earlier entries: a
+torn final member is dropped (with a warning) the next time the store loads.
+Enable it with ``AGENT_CASSETTE_MODE=record|replay`` and
+``AGENT_CASSETTE_DIR``; ``AGENT_CASSETTE_TIMING=1`` replays original
+latencies.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from agents import (
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    MultiProvider,
+    Usage,
+    set_tracing_disabled,
+)
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputItem,
+    ResponseOutputMessage,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from pydantic import TypeAdapter
+
+from agent import backends, model_router
+from agent.backends import EmailBackend, SearchBackend
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("model", "search", "email")
+
+_output_items = TypeAdapter(list[ResponseOutputItem])
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when a call was never recorded."""
+
+
+def fingerprint(request: Any) -> str:
+    """Return a stable hash of a JSON-serialisable request."""
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()[:32]
+
+
+class CassetteStore:
+    """Append-only cassette files indexed by request fingerprint."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open (creating if needed) the cassette directory and index its entries."""
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index: dict[str, dict[str, deque[dict[str, Any]]]] = {k: {} for k in KINDS}
+        self._last: dict[str, dict[str, Any]] = {}
+        for kind in KINDS:
+            self._load(kind)
+
+    def _file(self, kind: str) -> Path:
+        return self.path / f"{kind}.jsonl.gz"
+
+    @staticmethod
+    def _encode(entry: dict[str, Any]) -> bytes:
+        return gzip.compress((json.dumps(entry, default=str) + "\n").encode())
+
+    def _load(self, kind: str) -> None:
+        file = self._file(kind)
+        if not file.exists():
+            return
+        entries = []
+        try:
+            with gzip.open(file, "rt") as f:
+                for line in f:
+                    entries.append(json.loads(line))
+        except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError) as e:
+            # A crash mid-write leaves a torn last member; keep the complete ones and
+            # rewrite the file so later appends aren't stuck behind the torn bytes
+            logger.warning(f"⚠️  CASSETTE: dropping torn entry at the end of {file} ({e})")
+            tmp = file.with_suffix(".tmp")
+            tmp.write_bytes(b"".join(self._encode(entry) for entry in entries))
+            os.replace(tmp, file)
+        for entry in entries:
+            self._index[kind].setdefault(entry["fp"], deque()).append(entry)
+
+    def record(self, kind: str, request: Any, response: Any, latency: float) -> None:
+        """Append one call to the cassette."""
+        entry = {
+            "fp": fingerprint(request),
+            "request": request,
+            "response": response,
+            "latency": round(latency, 6),
+        }
+        data = self._encode(entry)
+        with self._lock, self._file(kind).open("ab") as f:
+            f.write(data)
+
+    def lookup(self, kind: str, request: Any) -> dict[str, Any]:
+        """Return the next recorded entry for a request (last one repeats)."""
+        fp = fingerprint(request)
+        key = f"{kind}:{fp}"
+        with self._lock:
+            entries = self._index[kind].get(fp)
+            if entries:
+                self._last[key] = entries.popleft()
+            entry = self._last.get(key)
+        if entry is None:
+            raise CassetteMiss(f"no recorded {kind} call for fingerprint {fp}")
+        return entry
+
+    def __len__(self) -> int:
+        """Return the number of recorded calls not yet replayed."""
+        return sum(len(e) for index in self._index.values() for e in index.values())
+
+
+# -----------------------------------------------------------------------------
+# Model calls
+# -----------------------------------------------------------------------------
+def _model_request(
+    model_name: str, system_instructions: str | None, input: Any, output_schema: Any
+) -> dict[str, Any]:
+    return {
+        "model": model_name,
+        "system": system_instructions,
+        "input": input,
+        "output_schema": output_schema.name() if output_schema else None,
+    }
+
+
+def _dump_response(response: ModelResponse) -> dict[str, Any]:
+    usage = response.usage
+    return {
+        "output": [item.model_dump(mode="json") for item in response.output],
+        "usage": {
+            "requests": usage.requests,
+            "input_tokens": usage.input_tokens,
+            "cached_tokens": usage.input_tokens_details.cached_tokens or 0,
+            "output_tokens": usage.output_tokens,
+            "total_tokens": usage.total_tokens,
+        },
+    }
+
+
+def _usage_from_stream(usage: ResponseUsage | None) -> Usage:
+    """Convert the usage on a streamed ``response.completed`` event."""
+    if usage is None:
+        return Usage(requests=1)
+    return Usage(
+        requests=1,
+        input_tokens=usage.input_tokens,
+        input_tokens_details=usage.input_tokens_details,
+        output_tokens=usage.output_tokens,
+        output_tokens_details=usage.output_tokens_details,
+        total_tokens=usage.total_tokens,
+    )
+
+
+def _usage_for_stream(usage: Usage) -> ResponseUsage:
+    """Convert recorded usage back for a replayed ``response.completed`` event."""
+    return ResponseUsage(
+        input_tokens=usage.input_tokens,
+        input_tokens_details=usage.input_tokens_details,
+        output_tokens=usage.output_tokens,
+        output_tokens_details=usage.output_tokens_details,
+        total_tokens=usage.total_tokens,
+    )
+
+
+def _load_response(data: dict[str, Any]) -> ModelResponse:
+    raw = data["usage"]
+    usage = Usage(
+        requests=raw["requests"],
+        input_tokens=raw["input_tokens"],
+        output_tokens=raw["output_tokens"],
+        total_tokens=raw["total_tokens"],
+    )
+    usage.input_tokens_details.cached_tokens = raw["cached_tokens"]
+    return ModelResponse(
+        output=_output_items.validate_python(data["output"]),
+        usage=usage,
+        response_id=None,
+    )
+
+
+class RecordingModel(Model):
+    """Wraps a model and records each response."""
+
+    def __init__(self, inner: Model, model_name: str, store: CassetteStore) -> None:
+        """Record calls to ``inner`` under ``model_name`` into ``store``."""
+        self.inner = inner
+        self.model_name = model_name
+        self.store = store
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        """Call the wrapped model and record its response."""
+        start = time.perf_counter()
+        response = await self.inner.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        )
+        self.store.record(
+            "model",
+            _model_request(self.model_name, system_instructions, input, output_schema),
+            _dump_response(response),
+            time.perf_counter() - start,
+        )
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Stream from the wrapped model, recording the completed response."""
+        start = time.perf_counter()
+        async for event in self.inner.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                response = ModelResponse(
+                    output=event.response.output,
+                    usage=_usage_from_stream(event.response.usage),
+                    response_id=None,
+                )
+                self.store.record(
+                    "model",
+                    _model_request(self.model_name, system_instructions, input, output_schema),
+                    _dump_response(response),
+                    time.perf_counter() - start,
+                )
+            yield event
+
+
+class ReplayModel(Model):
+    """Answers model calls from the cassette."""
+
+    def __init__(self, model_name: str, store: CassetteStore, timing: bool) -> None:
+        """Replay ``model_name``'s calls from ``store``, optionally with recorded latency."""
+        self.model_name = model_name
+        self.store = store
+        self.timing = timing
+
+    async def _replay(self, system_instructions: str | None, input: Any, output_schema: Any) -> ModelResponse:
+        entry = self.store.lookup(
+            "model", _model_request(self.model_name, system_instructions, input, output_schema)
+        )
+        if self.timing:
+            await asyncio.sleep(entry["latency"])
+        return _load_response(entry["response"])
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        """Return the recorded response."""
+        return await self._replay(system_instructions, input, output_schema)
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Stream the recorded response as text deltas and a completed event."""
+        response = await self._replay(system_instructions, input, output_schema)
+        seq = 0
+        for item in response.output:
+            if not isinstance(item, ResponseOutputMessage):
+                continue
+            for part in item.content:
+                text = getattr(part, "text", "")
+                yield ResponseTextDeltaEvent(
+                    content_index=0,
+                    delta=text,
+                    item_id=item.id,
+                    logprobs=[],
+                    output_index=0,
+                    sequence_number=seq,
+                    type="response.output_text.delta",
+                )
+                seq += 1
+        completed = Response.model_construct(
+            id="replay",
+            object="response",
+            created_at=time.time(),
+            model=self.model_name,
+            output=response.output,
+            status="completed",
+            usage=_usage_for_stream(response.usage),
+        )
+        yield ResponseCompletedEvent(response=completed, sequence_number=seq, type="response.completed")
+
+
+class CassetteModelProvider(ModelProvider):
+    """Model provider that records through ``inner`` or replays from the store."""
+
+    def __init__(self, store: CassetteStore, inner: ModelProvider | None = None, timing: bool = False) -> None:
+        """Record through ``inner``, or replay from ``store`` when it is ``None``."""
+        self.store = store
+        self.inner = inner
+        self.timing = timing
+
+    def get_model(self, model_name: str | None) -> Model:
+        """Return a recording or replaying wrapper for ``model_name``."""
+        name = model_name or "default"
+        if self.inner is None:
+            return ReplayModel(name, self.store, self.timing)
+        return RecordingModel(self.inner.get_model(model_name), name, self.store)
+
+
+# -----------------------------------------------------------------------------
+# Search and email backends
+# -----------------------------------------------------------------------------
+class CassetteSearchBackend:
+    """Search backend that records through ``inner`` or replays from the store."""
+
+    configured = True
+
+    def __init__(self, store: CassetteStore, inner: SearchBackend | None = None, timing: bool = False) -> None:
+        """Record through ``inner``, or replay from ``store`` when it is ``None``."""
+        self.store = store
+        self.inner = inner
+        self.timing = timing
+        if inner is not None:
+            self.configured = inner.configured
+
+    def search(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Search through the wrapped backend (recording) or the cassette."""
+        if self.inner is None:
+            entry = self.store.lookup("search", params)
+            if self.timing:
+                time.sleep(entry["latency"])
+            result: dict[str, Any] = entry["response"]
+            return result
+
+        start = time.perf_counter()
+        result = self.inner.search(params)
+        self.store.record("search", params, result, time.perf_counter() - start)
+        return result
+
+
+class CassetteEmailBackend:
+    """Email backend that records through ``inner`` or replays (never sends)."""
+
+    configured = True
+
+    def __init__(self, store: CassetteStore, inner: EmailBackend | None = None, timing: bool = False) -> None:
+        """Record through ``inner``, or replay from ``store`` when it is ``None``."""
+        self.store = store
+        self.inner = inner
+        self.timing = timing
+        if inner is not None:
+            self.configured = inner.configured
+
+    def send(self, to: str, subject: str, body: str) -> int:
+        """Send through the wrapped backend (recording) or replay the status."""
+        request = {"to": to, "subject": subject, "body": body}
+        if self.inner is None:
+            entry = self.store.lookup("email", request)
+            if self.timing:
+                time.sleep(entry["latency"])
+            return int(entry["response"])
+
+        start = time.perf_counter()
+        status = self.inner.send(to, subject, body)
+        self.store.record("email", request, status, time.perf_counter() - start)
+        return status
+
+
+def install_cassette(mode: str, path: str | Path, timing: bool = False) -> CassetteStore:
+    """Wrap the active model provider and backends for record or replay.
+
+    Args:
+        mode: ``"record"`` or ``"replay"``
+        path: Cassette directory
+        timing: In replay mode, sleep for each call's recorded latency
+
+    Returns:
+        The cassette store
+    """
+    if mode not in ("record", "replay"):
+        raise ValueError(f"unknown cassette mode {mode!r}")
+
+    store = CassetteStore(path)
+    if mode == "record":
+        inner = model_router.get_model_provider() or MultiProvider()
+        model_router.set_model_provider(CassetteModelProvider(store, inner))
+        backends.set_search_backend(CassetteSearchBackend(store, backends.get_search_backend()))
+        backends.set_email_backend(CassetteEmailBackend(store, backends.get_email_backend()))
+    else:
+        # Replay is fully offline, so don't export traces either
+        set_tracing_disabled(True)
+        model_router.set_model_provider(CassetteModelProvider(store, timing=timing))
+        backends.set_search_backend(CassetteSearchBackend(store, timing=timing))
+        backends.set_email_backend(CassetteEmailBackend(store, timing=timing))
+
+    logger.info(f"📼 CASSETTE: {mode} mode at {store.path} ({len(store)} recorded calls)")
+    return store
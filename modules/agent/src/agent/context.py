@@ -0,0 +1,89 @@
+"""Static instruction blocks and prompt-cache accounting for every agent.
+
+Provider prompt caching reuses the longest byte-identical prefix of a request.
+Agent inputs are therefore built from most to least stable: a static
+instruction block first (byte-identical on every call), then conversation
+history (append-mostly), then per-request content, with per-attempt content
+such as evaluator feedback last.
+
+This module holds those instruction blocks and records per-agent cache hits
+(``record_usage``, ``cache_usage``). ``agent.templates`` builds the inputs.
+"""
+
+import logging
+
+from agents import RunResult
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+# -----------------------------------------------------------------------------
+# Static instruction blocks. Never interpolate into these: any per-request byte
+# here shifts the cacheable prefix for every later section.
+# -----------------------------------------------------------------------------
+FRONTLINE_INSTRUCTION = (
+    "Decide whether to handle the current user message directly or route to the orchestrator."
+)
+ORCHESTRATOR_INSTRUCTION = (
+    "Analyze the current user request and determine which worker should handle it."
+)
+EVALUATOR_INSTRUCTION = (
+    "Evaluate the worker output against the success criteria and provide your assessment. "
+    "For a revision, you also get the feedback you gave and the changes made since; "
+    "judge whether the changes address it."
+)
+# Workers get a previous draft on retries; they revise it rather than start over
+REVISION_INSTRUCTION = (
+    "If a previous draft is given, revise it to address the feedback and keep what already works."
+)
+SEARCH_WORKER_INSTRUCTION = (
+    "Synthesize the search results into a clear, informative response to the task. "
+    + REVISION_INSTRUCTION
+)
+EMAIL_WORKER_INSTRUCTION = (
+    "Compose the email for the task and confirm it's ready to send. "
+    "Return a JSON with to, subject, and body fields. "
+    "If a current draft is given, rewrite only the fields listed to revise."
+)
+GENERAL_WORKER_INSTRUCTION = "Respond to the task below. " + REVISION_INSTRUCTION
+
+# -----------------------------------------------------------------------------
+# Prompt-cache accounting (per agent, process lifetime)
+# -----------------------------------------------------------------------------
+class CacheUsage(BaseModel):
+    """Accumulated token usage for one agent."""
+
+    calls: int = Field(default=0, description="Runner.run calls recorded")
+    input_tokens: int = Field(default=0, description="Total input tokens sent")
+    cached_tokens: int = Field(default=0, description="Input tokens served from the provider's prompt cache")
+
+    @property
+    def hit_ratio(self) -> float:
+        """Fraction of input tokens served from cache."""
+        if not self.input_tokens:
+            return 0.0
+        return self.cached_tokens / self.input_tokens
+
+
+_usage: dict[str, CacheUsage] = {}
+
+
+def record_usage(agent_name: str, result: RunResult) -> None:
+    """Record input and cached-token counts from a finished run."""
+    usage = result.context_wrapper.usage
+    cached = usage.input_tokens_details.cached_tokens or 0
+
+    stats = _usage.setdefault(agent_name, CacheUsage())
+    stats.calls += 1
+    stats.input_tokens += usage.input_tokens
+    stats.cached_tokens += cached
+
+    logger.debug(
+        f"📦 CONTEXT: {agent_name} cached {cached}/{usage.input_tokens} input tokens "
+        f"(lifetime hit ratio {stats.hit_ratio:.0%})"
+    )
+
+
+def cache_usage() -> dict[str, CacheUsage]:
+    """Return a snapshot of per-agent prompt-cache usage."""
+    return {name: stats.model_copy() for name, stats in _usage.items()}
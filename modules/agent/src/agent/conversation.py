@@ -0,0 +1,109 @@
+"""Compact conversation storage with incrementally rendered history windows.
+
+Agents see history as ``ROLE: content`` lines over the last N messages.
+Rather than re-formatting a slice of the conversation on every call, each
+message renders its line once, and every window size a consumer asks for is
+kept up to date as messages are appended.
+"""
+
+import sys
+from collections import deque
+from collections.abc import Iterable, Iterator
+
+
+class Message:
+    """A single conversation message, stored only as its rendered line.
+
+    The content is sliced back out of the line on demand, so keeping the
+    rendered form costs no memory over keeping the raw content.
+    """
+
+    __slots__ = ("role", "line")
+
+    def __init__(self, role: str, content: str) -> None:
+        """Render ``content`` as a ``ROLE: content`` line."""
+        self.role = role
+        self.line = f"{role.upper()}: {content}"
+
+    @property
+    def content(self) -> str:
+        """Return the raw message content."""
+        return self.line[len(self.role) + 2 :]
+
+    def to_dict(self) -> dict[str, str]:
+        """Return the message in the ``{"role", "content"}`` wire format."""
+        return {"role": self.role, "content": self.content}
+
+
+class _Window:
+    """Rendered lines for the last ``size`` messages, joined lazily."""
+
+    __slots__ = ("lines", "text")
+
+    def __init__(self, size: int, messages: list[Message]) -> None:
+        self.lines: deque[str] = deque((m.line for m in messages[-size:]), maxlen=size)
+        self.text: str | None = None
+
+    def push(self, line: str) -> None:
+        self.lines.append(line)
+        self.text = None
+
+    def render(self) -> str:
+        if self.text is None:
+            self.text = "\n".join(self.lines)
+        return self.text
+
+
+class Conversation:
+    """Append-only message list that keeps per-consumer history windows."""
+
+    __slots__ = ("_messages", "_windows")
+
+    def __init__(self, messages: Iterable[dict[str, str]] = ()) -> None:
+        """Start from ``{"role", "content"}`` messages, with no windows yet."""
+        self._messages: list[Message] = [Message(m["role"], m["content"]) for m in messages]
+        self._windows: dict[int, _Window] = {}
+
+    def __len__(self) -> int:
+        """Return the number of messages."""
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        """Iterate over the messages, oldest first."""
+        return iter(self._messages)
+
+    def __getitem__(self, index: int) -> Message:
+        """Return the message at ``index``."""
+        return self._messages[index]
+
+    def append(self, role: str, content: str) -> Message:
+        """Append a message and advance every registered window."""
+        message = Message(role, content)
+        self._messages.append(message)
+        for window in self._windows.values():
+            window.push(message.line)
+        return message
+
+    def window(self, size: int) -> str:
+        """Return the rendered transcript of the last ``size`` messages.
+
+        The first request for a size registers a window; later calls reuse
+        it, so the cost per turn is independent of conversation length.
+        """
+        window = self._windows.get(size)
+        if window is None:
+            window = self._windows[size] = _Window(size, self._messages)
+        return window.render()
+
+    def nbytes(self) -> int:
+        """Estimate the memory held by the messages and rendered windows."""
+        size = sys.getsizeof(self._messages)
+        size += sum(sys.getsizeof(m) + sys.getsizeof(m.line) for m in self._messages)
+        for window in list(self._windows.values()):
+            # Window lines share the messages' strings; only the joined text is extra
+            size += sys.getsizeof(window.lines) + (sys.getsizeof(window.text) if window.text else 0)
+        return size
+
+    def to_list(self) -> list[dict[str, str]]:
+        """Return the full history in the ``{"role", "content"}`` wire format."""
+        return [m.to_dict() for m in self._messages]
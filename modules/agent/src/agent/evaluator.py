@@ -1,25 +1,51 @@
+import difflib
 import logging
-import os
+import re
 
 from agents import Agent, AgentOutputSchema, Runner
 
-from agent.models import EvaluatorResult
+from agent.context import record_usage
+from agent.model_router import RoutingSignals, default_model, run_config
+from agent.models import EvaluatorResult, WorkerType
 from agent.prompts import EVALUATOR_SYSTEM_PROMPT
+from agent.templates import EVALUATOR
 
 logger = logging.getLogger(__name__)
 
+# Add a diff to the full output only when it is this much smaller (a near
+# rewrite is easier to judge from the output alone)
+DIFF_RATIO = 0.5
+
+_units = re.compile(r"(?<=[.!?])\s+|\n")
+
 _agent = Agent(
     name="Evaluator",
     instructions=EVALUATOR_SYSTEM_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+    model=default_model("evaluator"),
     output_type=AgentOutputSchema(EvaluatorResult, strict_json_schema=False),
 )
 
 
+def output_diff(previous: str, current: str) -> str | None:
+    """Return a sentence-level unified diff, or None if it isn't worth sending."""
+    diff = "\n".join(
+        difflib.unified_diff(
+            _units.split(previous), _units.split(current), "previous", "current", lineterm="", n=1
+        )
+    )
+    if not diff or len(diff) > DIFF_RATIO * len(current):
+        return None
+    return diff
+
+
 async def evaluate(
     worker_output: str,
     task_description: str,
     success_criteria: str,
+    worker_type: WorkerType | None = None,
+    failures: int = 0,
+    previous_output: str | None = None,
+    previous_feedback: str | None = None,
 ) -> EvaluatorResult:
     """Evaluate worker output against success criteria.
 
@@ -27,6 +53,11 @@ async def evaluate(
         worker_output: The output produced by the worker
         task_description: Original task description
         success_criteria: Criteria to evaluate against
+        worker_type: Worker that produced the output, used for model routing
+        failures: Number of earlier attempts the evaluator already rejected
+        previous_output: Output of the rejected previous attempt; when the
+            revision is small, the diff against it is sent alongside the output
+        previous_feedback: Feedback given on the previous attempt
 
     Returns:
         EvaluatorResult with pass/fail decision and feedback
@@ -34,19 +65,29 @@ async def evaluate(
     logger.info("🔍 EVALUATOR: Starting evaluation")
     logger.info(f"   Criteria: {success_criteria[:80]}...")
 
-    context = f"""Task Description: {task_description}
+    diff = output_diff(previous_output, worker_output) if previous_output else None
+    if diff:
+        logger.info(f"   Adding diff ({len(diff)} chars) to the output ({len(worker_output)} chars)")
 
-Success Criteria: {success_criteria}
-
-Worker Output:
-{worker_output}
-
-Evaluate this output against the success criteria and provide your assessment."""
+    context = EVALUATOR.render(
+        task=task_description,
+        criteria=success_criteria,
+        output=worker_output,
+        previous_feedback=(previous_feedback or "") if diff else "",
+        changes=diff or "",
+    )
 
+    signals = RoutingSignals(
+        input_chars=len(worker_output) + len(diff or ""),
+        worker_type=worker_type,
+        evaluator_failures=failures,
+    )
     result = await Runner.run(
         _agent,
         input=context,
+        run_config=run_config("evaluator", signals),
     )
+    record_usage("evaluator", result)
 
     eval_result = result.final_output
     status = "PASS" if eval_result.passed else "FAIL"
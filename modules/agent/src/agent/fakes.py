@@ -0,0 +1,386 @@
+"""Deterministic offline stand-ins for the model provider and upstream APIs.
+
+``install_fakes()`` routes every ``Runner.run`` through ``FakeModelProvider``
+and swaps the search and email backends for ``FakeSearchBackend`` and
+``FakeEmailBackend``. Responses are canned per agent (recognised by the
+static instruction block each agent input starts with), latencies are drawn
+from seeded log-normal distributions, and nothing touches the network. Set
+``AGENT_OFFLINE=1`` to run the server this way.
+"""
+
+import asyncio
+import math
+import random
+import re
+import time
+from collections.abc import AsyncIterator
+from typing import Any
+
+from agents import (
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    Usage,
+    set_tracing_disabled,
+)
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseUsage,
+)
+from pydantic import BaseModel, Field
+
+from agent import backends, model_router
+from agent.context import (
+    EMAIL_WORKER_INSTRUCTION,
+    EVALUATOR_INSTRUCTION,
+    FRONTLINE_INSTRUCTION,
+    GENERAL_WORKER_INSTRUCTION,
+    ORCHESTRATOR_INSTRUCTION,
+    SEARCH_WORKER_INSTRUCTION,
+)
+from agent.models import EvaluatorResult, OrchestratorDecision, WorkerType
+
+SEARCH_KEYWORDS = ("search", "look up", "latest", "news", "weather", "research")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+
+_ROLES = (
+    (FRONTLINE_INSTRUCTION, "frontline"),
+    (ORCHESTRATOR_INSTRUCTION, "orchestrator"),
+    (EVALUATOR_INSTRUCTION, "evaluator"),
+    (SEARCH_WORKER_INSTRUCTION, "search_worker"),
+    (EMAIL_WORKER_INSTRUCTION, "email_worker"),
+    (GENERAL_WORKER_INSTRUCTION, "general_worker"),
+)
+
+
+class LatencyProfile(BaseModel):
+    """Log-normal latency distribution, in seconds."""
+
+    median: float = Field(default=0.0, description="Median latency")
+    sigma: float = Field(default=0.0, description="Log-space standard deviation (0 = fixed)")
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw one latency."""
+        if self.median <= 0:
+            return 0.0
+        return self.median * math.exp(rng.gauss(0.0, self.sigma))
+
+
+class FakeSettings(BaseModel):
+    """Behaviour of the fake provider and backends."""
+
+    seed: int = Field(default=0, description="Seed for every latency draw")
+    latency: LatencyProfile = Field(default_factory=LatencyProfile, description="Per-call model latency")
+    agent_latency: dict[str, LatencyProfile] = Field(
+        default_factory=dict, description="Per-agent overrides of the model latency"
+    )
+    token_latency: float = Field(default=0.0, description="Delay between streamed tokens")
+    search_latency: LatencyProfile = Field(default_factory=LatencyProfile, description="Per-search latency")
+    email_latency: LatencyProfile = Field(default_factory=LatencyProfile, description="Per-send latency")
+    evaluator_failures: int = Field(
+        default=0, description="Evaluations to fail per task before passing"
+    )
+    response_words: int = Field(default=60, description="Words in each canned worker response")
+
+
+class DirectResponse(BaseModel):
+    """Frontline JSON for a directly handled message."""
+
+    route_to_orchestrator: bool = False
+    response: str
+
+
+class OrchestratorRouting(BaseModel):
+    """Frontline JSON for a message routed to the orchestrator."""
+
+    route_to_orchestrator: bool = True
+    reason: str
+
+
+def _section(text: str, title: str) -> str:
+    r"""Extract one ``Title:\nbody`` section from an assembled context."""
+    match = re.search(
+        rf"(?:^|\n\n){re.escape(title)}:\n(.*?)(?=\n\n[A-Z][\w ]*:\n|\Z)", text, re.S
+    )
+    return match.group(1).strip() if match else ""
+
+
+def _input_text(input: str | list[Any]) -> str:
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        content = item.get("content", "") if isinstance(item, dict) else ""
+        parts.append(content if isinstance(content, str) else str(content))
+    return "\n\n".join(parts)
+
+
+class FakeModel(Model):
+    """Model that answers with canned, schema-valid output."""
+
+    def __init__(self, model_name: str, provider: "FakeModelProvider") -> None:
+        """Answer as ``model_name`` using ``provider``'s settings and counters."""
+        self.model_name = model_name
+        self.provider = provider
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        """Return the canned output after a sampled delay."""
+        text = _input_text(input)
+        role, output = self.provider.respond(text)
+        await asyncio.sleep(self.provider.model_latency(role))
+        return ModelResponse(
+            output=[_message(output)],
+            usage=_usage(text, output),
+            response_id=None,
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[Any],
+        model_settings: ModelSettings,
+        tools: list[Any],
+        output_schema: Any,
+        handoffs: list[Any],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Stream the canned output word by word, then a completed event."""
+        text = _input_text(input)
+        role, output = self.provider.respond(text)
+        await asyncio.sleep(self.provider.model_latency(role))
+
+        for seq, token in enumerate(re.findall(r"\S+\s*", output)):
+            if self.provider.settings.token_latency:
+                await asyncio.sleep(self.provider.settings.token_latency)
+            yield ResponseTextDeltaEvent(
+                content_index=0,
+                delta=token,
+                item_id="fake",
+                logprobs=[],
+                output_index=0,
+                sequence_number=seq,
+                type="response.output_text.delta",
+            )
+
+        usage = _usage(text, output)
+        response = Response.model_construct(
+            id="fake",
+            object="response",
+            created_at=time.time(),
+            model=self.model_name,
+            output=[_message(output)],
+            status="completed",
+            usage=ResponseUsage(
+                input_tokens=usage.input_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens=usage.output_tokens,
+                output_tokens_details=usage.output_tokens_details,
+                total_tokens=usage.total_tokens,
+            ),
+        )
+        yield ResponseCompletedEvent(
+            response=response, sequence_number=usage.output_tokens, type="response.completed"
+        )
+
+
+def _message(text: str) -> ResponseOutputMessage:
+    return ResponseOutputMessage(
+        id="fake",
+        content=[ResponseOutputText(annotations=[], text=text, type="output_text")],
+        role="assistant",
+        status="completed",
+        type="message",
+    )
+
+
+def _usage(input_text: str, output: str) -> Usage:
+    # Rough 4-characters-per-token estimate; only used for accounting
+    return Usage(
+        requests=1,
+        input_tokens=len(input_text) // 4,
+        output_tokens=len(output) // 4,
+        total_tokens=(len(input_text) + len(output)) // 4,
+    )
+
+
+class FakeModelProvider(ModelProvider):
+    """Model provider returning ``FakeModel`` for every model name."""
+
+    def __init__(self, settings: FakeSettings | None = None) -> None:
+        """Use ``settings`` (defaults if omitted) for latency and canned output."""
+        self.settings = settings or FakeSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.calls: dict[str, int] = {}
+        self._evaluations: dict[str, int] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        """Return a ``FakeModel`` whatever the name."""
+        return FakeModel(model_name or "fake", self)
+
+    def model_latency(self, role: str) -> float:
+        """Sample one call's latency in seconds for ``role``."""
+        profile = self.settings.agent_latency.get(role, self.settings.latency)
+        return profile.sample(self.rng)
+
+    def respond(self, text: str) -> tuple[str, str]:
+        """Return ``(agent role, output text)`` for an assembled agent input."""
+        role = next((r for prefix, r in _ROLES if text.startswith(prefix)), "general_worker")
+        self.calls[role] = self.calls.get(role, 0) + 1
+
+        if role == "frontline":
+            return role, self._frontline(_section(text, "Current user message"))
+        if role == "orchestrator":
+            return role, self._orchestrator(_section(text, "Current User Request"))
+        if role == "evaluator":
+            return role, self._evaluator(_section(text, "Task Description"))
+        return role, self._worker(_section(text, "Task") or text)
+
+    def _frontline(self, message: str) -> str:
+        lowered = message.lower()
+        if "email" in lowered or any(k in lowered for k in SEARCH_KEYWORDS):
+            return OrchestratorRouting(reason="Specialized task detected").model_dump_json()
+        return DirectResponse(response=f"Happy to help with: {message}").model_dump_json()
+
+    def _orchestrator(self, request: str) -> str:
+        lowered = request.lower()
+        if "email" in lowered:
+            match = EMAIL_PATTERN.search(request)
+            decision = OrchestratorDecision(
+                worker_type=WorkerType.EMAIL,
+                task_description=f"Send an email: {request}",
+                parameters={
+                    "to": match.group(0) if match else "someone@example.com",
+                    "subject": "Hello",
+                    "body": request,
+                },
+                success_criteria="Email is sent to the requested recipient",
+            )
+        elif any(k in lowered for k in SEARCH_KEYWORDS):
+            decision = OrchestratorDecision(
+                worker_type=WorkerType.SEARCH,
+                task_description=f"Research: {request}",
+                parameters={"query": request, "num_results": 5},
+                success_criteria="Answer summarizes relevant sources",
+            )
+        else:
+            decision = OrchestratorDecision(
+                worker_type=WorkerType.GENERAL,
+                task_description=request,
+                parameters={},
+                success_criteria="Response addresses the request",
+            )
+        return decision.model_dump_json()
+
+    def _evaluator(self, task: str) -> str:
+        seen = self._evaluations[task] = self._evaluations.get(task, 0) + 1
+        passed = seen > self.settings.evaluator_failures
+        if passed:
+            self._evaluations.pop(task)
+        result = EvaluatorResult(
+            passed=passed,
+            score=90 if passed else 40,
+            feedback="Meets the criteria." if passed else "Missing detail.",
+            suggestions="" if passed else "Add more specifics.",
+        )
+        return result.model_dump_json()
+
+    def _worker(self, task: str) -> str:
+        words = (f"{task} " * (self.settings.response_words // max(1, len(task.split())) + 1)).split()
+        return " ".join(words[: self.settings.response_words])
+
+
+class FakeSearchBackend:
+    """Search backend returning deterministic results for any query."""
+
+    configured = True
+
+    def __init__(self, settings: FakeSettings | None = None, results: int = 10) -> None:
+        """Return at most ``results`` results per query."""
+        self.settings = settings or FakeSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.results = results
+        self.queries: list[str] = []
+
+    def search(self, params: dict[str, Any]) -> dict[str, Any]:
+        """Record the query and return SerpAPI-shaped results."""
+        # Blocking, like the SerpAPI client it stands in for
+        time.sleep(self.settings.search_latency.sample(self.rng))
+        query = str(params.get("q", ""))
+        self.queries.append(query)
+        slug = re.sub(r"\W+", "-", query.lower()).strip("-")
+        return {
+            "organic_results": [
+                {
+                    "title": f"{query} — result {i}",
+                    "link": f"https://example.com/{slug}/{i}",
+                    "snippet": f"Result {i} about {query}.",
+                }
+                for i in range(1, min(self.results, int(params.get("num", 10))) + 1)
+            ]
+        }
+
+
+class FakeEmailBackend:
+    """Email backend that records messages instead of sending them."""
+
+    configured = True
+
+    def __init__(self, settings: FakeSettings | None = None) -> None:
+        """Use ``settings`` (defaults if omitted) for send latency."""
+        self.settings = settings or FakeSettings()
+        self.rng = random.Random(self.settings.seed)
+        self.sent: list[dict[str, str]] = []
+
+    def send(self, to: str, subject: str, body: str) -> int:
+        """Record the message and return SendGrid's accepted status."""
+        time.sleep(self.settings.email_latency.sample(self.rng))
+        self.sent.append({"to": to, "subject": subject, "body": body})
+        return 202
+
+
+class FakeSocket:
+    """Stand-in for a WebSocket that records the frames sent to it."""
+
+    def __init__(self) -> None:
+        """Start with no frames."""
+        self.frames: list[str] = []
+
+    async def send_text(self, data: str) -> None:
+        """Record one text frame."""
+        self.frames.append(data)
+
+
+def install_fakes(settings: FakeSettings | None = None) -> FakeModelProvider:
+    """Route the model provider and upstream APIs to fakes; returns the provider."""
+    settings = settings or FakeSettings()
+    provider = FakeModelProvider(settings)
+    model_router.set_model_provider(provider)
+    backends.set_search_backend(FakeSearchBackend(settings))
+    backends.set_email_backend(FakeEmailBackend(settings))
+    set_tracing_disabled(True)
+    return provider
+
+
+def uninstall_fakes() -> None:
+    """Restore the OpenAI provider and the real upstream backends."""
+    model_router.set_model_provider(None)
+    backends.set_search_backend(None)
+    backends.set_email_backend(None)
+    set_tracing_disabled(False)
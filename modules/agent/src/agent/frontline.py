@@ -1,23 +1,30 @@
 import json
 import logging
-import os
+import re
 
 from agents import Agent, Runner
 
+from agent.context import record_usage
+from agent.conversation import Conversation
+from agent.model_router import default_model, run_config
 from agent.prompts.frontline import FRONTLINE_SYSTEM_PROMPT
+from agent.templates import FRONTLINE
 
 logger = logging.getLogger(__name__)
 
+# A reply wrapped in a code fence: ```json ... ``` (closing fence optional)
+_fence = re.compile(r"```(?:json)?(.*?)(?:```|\Z)", re.S)
+
 _agent = Agent(
     name="Frontline",
     instructions=FRONTLINE_SYSTEM_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"),
+    model=default_model("frontline"),
 )
 
 
 async def process(
     user_input: str,
-    conversation_history: list[dict[str, str]],
+    conversation_history: Conversation,
 ) -> tuple[bool, str]:
     """Process user input and decide whether to handle directly or route.
 
@@ -31,33 +38,19 @@ async def process(
     logger.info("⚡ FRONTLINE: Processing request")
     logger.info(f"   Input: {user_input[:80]}...")
 
-    history_context = ""
-    if conversation_history:
-        recent = conversation_history[-4:]
-        history_context = "\n".join(
-            [f"{m['role'].upper()}: {m['content']}" for m in recent]
-        )
-
-    context = f"""Recent conversation:
-{history_context}
-
-Current user message: {user_input}
-
-Decide whether to handle this directly or route to the orchestrator."""
+    context = FRONTLINE.render(history=conversation_history.window(4), message=user_input)
 
     result = await Runner.run(
         _agent,
         input=context,
+        run_config=run_config("frontline"),
     )
+    record_usage("frontline", result)
 
     response_text = result.final_output.strip()
-
-    if not response_text.startswith("```"):
-        return _parse_decision(response_text, result.final_output)
-
-    response_text = response_text.split("```")[1]
-    if response_text.startswith("json"):
-        response_text = response_text[4:]
+    fenced = _fence.match(response_text)
+    if fenced:
+        response_text = fenced.group(1)
 
     return _parse_decision(response_text, result.final_output)
 
@@ -0,0 +1,269 @@
+"""WebSocket load generator for concurrent-conversation throughput testing.
+
+Opens many connections to ``/ws``, follows the client protocol (``init``
+frame, then one ``message`` frame per turn) and replays scripted multi-turn
+conversations at a configurable arrival rate. Reports time to first frame,
+time to ``on_chat_model_end``, error rates and server RSS growth.
+
+Run against a live server::
+
+    python -m agent.loadgen --url ws://localhost:8000/ws --server-pid <pid>
+
+or let it start a reproducible offline server (fake model provider)::
+
+    python -m agent.loadgen --spawn --connections 2000 --rate 200
+
+Thousands of connections need a raised open-files limit (``ulimit -n``).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any
+
+from pydantic import BaseModel, Field
+from websockets.asyncio.client import connect
+
+from agent.metrics import percentiles, rss_mb
+
+DEFAULT_SCRIPT = [
+    ["hello there", "what can you do?"],
+    ["search for the latest AI news", "thanks, anything about robotics?"],
+    ["send an email to team@example.com about the meeting"],
+]
+
+
+class LoadReport(BaseModel):
+    """Summary of one load-generation run."""
+
+    conversations: int = Field(description="Conversations started")
+    connect_errors: int = Field(description="Connections that failed to open")
+    turns: int = Field(description="Turns that completed with on_chat_model_end")
+    turn_errors: int = Field(description="Turns that timed out or lost the socket")
+    error_rate: float = Field(description="Failed turns and connections over attempts")
+    duration_s: float = Field(description="Wall-clock duration of the run")
+    turns_per_s: float = Field(description="Completed turns per second")
+    first_frame_ms: dict[str, float] = Field(description="Time to first frame percentiles")
+    end_ms: dict[str, float] = Field(description="Time to on_chat_model_end percentiles")
+    rss_mb: dict[str, float] = Field(default_factory=dict, description="Server RSS start/peak/end")
+
+
+class _Stats:
+    __slots__ = ("first_frame", "end", "turn_errors", "connect_errors")
+
+    def __init__(self) -> None:
+        self.first_frame: list[float] = []
+        self.end: list[float] = []
+        self.turn_errors = 0
+        self.connect_errors = 0
+
+
+async def _conversation(
+    url: str,
+    turns: list[str],
+    think_time: float,
+    timeout: float,
+    stats: _Stats,
+) -> None:
+    conversation_id = str(uuid.uuid4())
+    try:
+        ws = await asyncio.wait_for(connect(url, max_size=None), timeout)
+    except Exception:
+        stats.connect_errors += 1
+        return
+
+    async with ws:
+        await ws.send(json.dumps({"uuid": conversation_id, "init": True}))
+        for i, message in enumerate(turns):
+            if i and think_time:
+                await asyncio.sleep(think_time)
+            try:
+                await asyncio.wait_for(_turn(ws, conversation_id, message, stats), timeout)
+            except Exception:
+                stats.turn_errors += 1
+                return
+
+
+async def _turn(ws: Any, conversation_id: str, message: str, stats: _Stats) -> None:
+    start = time.perf_counter()
+    await ws.send(json.dumps({"uuid": conversation_id, "message": message}))
+    first = True
+    async for raw in ws:
+        if first:
+            stats.first_frame.append(time.perf_counter() - start)
+            first = False
+        if json.loads(raw).get("on_chat_model_end"):
+            stats.end.append(time.perf_counter() - start)
+            return
+    raise ConnectionError("socket closed mid-turn")
+
+
+async def _sample_rss(pid: int, samples: list[float], interval: float = 0.5) -> None:
+    while True:
+        rss = rss_mb(pid)
+        if rss is not None:
+            samples.append(rss)
+        await asyncio.sleep(interval)
+
+
+async def run_load(
+    url: str,
+    script: list[list[str]],
+    connections: int,
+    rate: float,
+    think_time: float = 0.0,
+    timeout: float = 120.0,
+    server_pid: int | None = None,
+    seed: int = 0,
+) -> LoadReport:
+    """Run ``connections`` scripted conversations with Poisson arrivals.
+
+    Args:
+        url: WebSocket URL of the ``/ws`` endpoint
+        script: Conversations to replay, cycled across connections
+        connections: Number of conversations (one connection each)
+        rate: Mean new conversations per second (0 = all at once)
+        think_time: Pause between turns of a conversation, in seconds
+        timeout: Per-connect and per-turn timeout, in seconds
+        server_pid: Server process to sample RSS from (Linux only)
+        seed: Seed for arrival times
+
+    Returns:
+        LoadReport with latency percentiles, error rates and RSS growth
+    """
+    rng = random.Random(seed)
+    stats = _Stats()
+    rss: list[float] = []
+    sampler = asyncio.create_task(_sample_rss(server_pid, rss)) if server_pid else None
+
+    start = time.perf_counter()
+    tasks = []
+    for i in range(connections):
+        turns = script[i % len(script)]
+        tasks.append(asyncio.create_task(_conversation(url, turns, think_time, timeout, stats)))
+        if rate > 0:
+            await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+    duration = time.perf_counter() - start
+
+    if sampler:
+        sampler.cancel()
+        final = rss_mb(server_pid) if server_pid else None
+        if final is not None:
+            rss.append(final)
+
+    attempted = sum(len(script[i % len(script)]) for i in range(connections))
+    return LoadReport(
+        conversations=connections,
+        connect_errors=stats.connect_errors,
+        turns=len(stats.end),
+        turn_errors=stats.turn_errors,
+        error_rate=(attempted - len(stats.end)) / attempted if attempted else 0.0,
+        duration_s=round(duration, 3),
+        turns_per_s=round(len(stats.end) / duration, 2) if duration else 0.0,
+        first_frame_ms={k: round(v * 1e3, 1) for k, v in percentiles(stats.first_frame).items()},
+        end_ms={k: round(v * 1e3, 1) for k, v in percentiles(stats.end).items()},
+        rss_mb={
+            "start": round(rss[0], 1),
+            "peak": round(max(rss), 1),
+            "end": round(rss[-1], 1),
+        }
+        if rss
+        else {},
+    )
+
+
+def load_script(path: str | None) -> list[list[str]]:
+    """Load conversations from JSONL (``{"turns": [...]}`` per line)."""
+    if not path:
+        return DEFAULT_SCRIPT
+    with open(path) as f:
+        return [json.loads(line)["turns"] for line in f if line.strip()]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+async def _wait_for_port(port: int, proc: subprocess.Popen[bytes], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with code {proc.returncode}")
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise TimeoutError("server did not start listening")
+
+
+def spawn_offline_server(fake_settings: str = "{}") -> tuple[subprocess.Popen[bytes], int]:
+    """Start ``agent.server`` with the fake provider; returns (process, port)."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "AGENT_OFFLINE": "1",
+        "AGENT_FAKE_SETTINGS": fake_settings,
+        "AGENT_PRELOAD_WORKERS": "1",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "agent.server:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return proc, port
+
+
+async def _main(args: argparse.Namespace) -> LoadReport:
+    script = load_script(args.script)
+    if not args.spawn:
+        return await run_load(
+            args.url, script, args.connections, args.rate, args.think_time, args.timeout, args.server_pid, args.seed
+        )
+
+    proc, port = spawn_offline_server(args.fake_settings)
+    try:
+        await _wait_for_port(port, proc)
+        return await run_load(
+            f"ws://127.0.0.1:{port}/ws", script, args.connections, args.rate, args.think_time, args.timeout, proc.pid, args.seed
+        )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="ws://localhost:8000/ws", help="WebSocket endpoint")
+    parser.add_argument("--connections", type=int, default=100, help="Conversations to run")
+    parser.add_argument("--rate", type=float, default=50.0, help="New conversations per second (0 = burst)")
+    parser.add_argument("--script", help="JSONL of {\"turns\": [...]} conversations")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds between turns")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-turn timeout in seconds")
+    parser.add_argument("--server-pid", type=int, help="Server pid to sample RSS from")
+    parser.add_argument("--seed", type=int, default=0, help="Arrival-time seed")
+    parser.add_argument("--spawn", action="store_true", help="Start an offline server (fake provider)")
+    parser.add_argument(
+        "--fake-settings", default="{}", help="FakeSettings JSON for --spawn (latencies, failures)"
+    )
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_main(args))
+    print(report.model_dump_json(indent=2))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
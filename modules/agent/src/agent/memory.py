@@ -0,0 +1,177 @@
+"""Memory accounting for a live server process.
+
+``report`` estimates what each subsystem holds (conversations, run buffers,
+caches, sockets, tasks, logging) and, when the ``SnapshotMonitor`` is
+running, adds the top tracemalloc allocation sites. It also diffs the latest
+snapshot against the first one and the previous one, so steady growth
+stands out. Served by ``GET /admin/memory``.
+
+Apart from counting asyncio tasks, the report is built in a worker thread:
+``gc.get_objects()`` and tracemalloc statistics take long enough on a big
+heap to stall every socket. That thread reads state the event loop keeps
+mutating, so it copies each container (``list(d.values())``, atomic under
+the GIL) before walking it, and the figures are a best-effort estimate.
+
+The monitor is off by default because tracemalloc slows every allocation.
+``AGENT_MEMORY_SNAPSHOT_INTERVAL=<seconds>`` starts it with the server.
+"""
+
+import asyncio
+import gc
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tracemalloc
+from typing import Any
+
+from agent import context, profiling, runner, workers
+from agent.metrics import rss_mb
+from agent.runs import RunRegistry
+
+SNAPSHOT_INTERVAL = float(os.getenv("AGENT_MEMORY_SNAPSHOT_INTERVAL", "0"))
+
+
+def _mb(size: int) -> float:
+    return round(size / 2**20, 3)
+
+
+def _conversations() -> dict[str, Any]:
+    conversations = list(runner._conversations.values())
+    return {
+        "count": len(conversations),
+        "messages": sum(len(c) for c in conversations),
+        "mb": _mb(sys.getsizeof(runner._conversations) + sum(c.nbytes() for c in conversations)),
+    }
+
+
+def _runs(registry: RunRegistry) -> dict[str, Any]:
+    buffers = [run.frames for run in list(registry._runs.values())]
+    return {
+        "count": len(registry),
+        "in_flight": registry.in_flight,
+        "frames": sum(len(f) for f in buffers),
+        "mb": _mb(sum(sys.getsizeof(f) + sum(sys.getsizeof(x) for x in f) for f in buffers)),
+    }
+
+
+def _caches() -> dict[str, Any]:
+    usage = list(context._usage.values())
+    return {
+        "prompt_cache": {
+            "agents": len(usage),
+            "mb": _mb(sys.getsizeof(context._usage) + sum(sys.getsizeof(u) for u in usage)),
+        },
+        "workers": {
+            "registered": len(workers._workers),
+            "loaded": len(workers._loaded),
+            "mb": _mb(sys.getsizeof(workers._workers) + sys.getsizeof(workers._loaded)),
+        },
+    }
+
+
+def _logging() -> dict[str, Any]:
+    loggers = [logging.getLogger()] + [
+        lg for lg in list(logging.Logger.manager.loggerDict.values()) if isinstance(lg, logging.Logger)
+    ]
+    handlers = [h for lg in loggers for h in lg.handlers]
+    buffered = 0
+    for handler in handlers:
+        if isinstance(handler, logging.handlers.MemoryHandler):
+            buffered += len(handler.buffer)
+        elif isinstance(handler, logging.handlers.QueueHandler) and isinstance(
+            handler.queue, (queue.Queue, queue.SimpleQueue)
+        ):
+            buffered += handler.queue.qsize()
+    return {"loggers": len(loggers), "handlers": len(handlers), "buffered_records": buffered}
+
+
+class SnapshotMonitor:
+    """Takes tracemalloc snapshots periodically and diffs them."""
+
+    def __init__(self, interval: float = SNAPSHOT_INTERVAL) -> None:
+        """Snapshot every ``interval`` seconds once ``run`` is started."""
+        self.interval = interval
+        self.taken = 0
+        self.baseline: tracemalloc.Snapshot | None = None
+        self.previous: tracemalloc.Snapshot | None = None
+        self.latest: tracemalloc.Snapshot | None = None
+
+    async def take(self) -> None:
+        """Take one snapshot off the event loop."""
+        snap = await asyncio.to_thread(profiling.snapshot)
+        self.previous, self.latest = self.latest, snap
+        if self.baseline is None:
+            self.baseline = snap
+        self.taken += 1
+
+    async def run(self) -> None:
+        """Snapshot every ``interval`` seconds until cancelled."""
+        profiling.start_tracing()
+        try:
+            while True:
+                await self.take()
+                await asyncio.sleep(self.interval)
+        finally:
+            profiling.stop_tracing()
+
+    def report(self, top: int = profiling.TOP) -> dict[str, Any]:
+        """Return the top allocation sites and the growth between snapshots."""
+        if self.baseline is None or self.latest is None:
+            return {"snapshots": 0}
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "snapshots": self.taken,
+            "traced_mb": _mb(current),
+            "traced_peak_mb": _mb(peak),
+            "top_sites": [
+                {
+                    "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    "size_kb": round(stat.size / 1024, 1),
+                    "count": stat.count,
+                }
+                for stat in self.latest.statistics("lineno")[:top]
+            ],
+            "growth_since_start": profiling.allocation_diff(self.baseline, self.latest, top),
+            "growth_since_previous": (
+                profiling.allocation_diff(self.previous, self.latest, top) if self.previous else []
+            ),
+        }
+
+
+async def report(
+    registry: RunRegistry,
+    open_sockets: int,
+    monitor: SnapshotMonitor | None = None,
+    top: int = profiling.TOP,
+) -> dict[str, Any]:
+    """Return per-subsystem memory estimates for this process.
+
+    Sizes are shallow ``sys.getsizeof`` estimates of what each subsystem holds
+    directly. Compare them with ``rss_mb`` and the tracemalloc sites.
+    """
+    # all_tasks() needs the running loop; everything else runs off it
+    tasks = len(asyncio.all_tasks())
+    return await asyncio.to_thread(_report, registry, open_sockets, tasks, monitor, top)
+
+
+def _report(
+    registry: RunRegistry,
+    open_sockets: int,
+    tasks: int,
+    monitor: SnapshotMonitor | None,
+    top: int,
+) -> dict[str, Any]:
+    return {
+        "pid": os.getpid(),
+        "rss_mb": rss_mb(),
+        "gc_objects": len(gc.get_objects()),
+        "conversations": _conversations(),
+        "runs": _runs(registry),
+        "caches": _caches(),
+        "websockets": open_sockets,
+        "asyncio_tasks": tasks,
+        "logging": _logging(),
+        "tracemalloc": monitor.report(top) if monitor else {"snapshots": 0},
+    }
@@ -0,0 +1,90 @@
+"""Per-stage wall-clock timings and latency percentiles.
+
+Pipeline stages wrap themselves in ``stage(name)``. Timings are only kept
+while a collector is active for the current task (see ``collect``); outside
+of one, ``stage`` is a no-op apart from a context-variable lookup.
+"""
+
+import math
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+
+class StageTimings:
+    """Durations in seconds, grouped by stage name."""
+
+    __slots__ = ("durations",)
+
+    def __init__(self) -> None:
+        """Start with no recorded stages."""
+        self.durations: dict[str, list[float]] = {}
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add one duration for stage ``name``."""
+        self.durations.setdefault(name, []).append(seconds)
+
+    def merge(self, other: "StageTimings") -> None:
+        """Add every duration recorded in ``other``."""
+        for name, samples in other.durations.items():
+            self.durations.setdefault(name, []).extend(samples)
+
+    def totals(self) -> dict[str, float]:
+        """Return the summed duration of each stage."""
+        return {name: sum(samples) for name, samples in self.durations.items()}
+
+
+_collector: ContextVar[StageTimings | None] = ContextVar("stage_collector", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as ``name`` if a collector is active."""
+    collector = _collector.get()
+    if collector is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        collector.record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect() -> Iterator[StageTimings]:
+    """Collect stage timings for the enclosed block (current task only)."""
+    timings = StageTimings()
+    token = _collector.set(timings)
+    try:
+        yield timings
+    finally:
+        _collector.reset(token)
+
+
+def percentiles(
+    samples: Iterable[float], points: Sequence[int] = (50, 95, 99)
+) -> dict[str, float]:
+    """Return nearest-rank percentiles, keyed ``p50``, ``p95``, ..."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{p}": 0.0 for p in points}
+    return {
+        f"p{p}": ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+        for p in points
+    }
+
+
+def rss_mb(pid: int | str = "self") -> float | None:
+    """Return a process's resident set size in MB (Linux only)."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            return int(line.split()[1]) / 1024
+    return None
@@ -0,0 +1,139 @@
+"""Per-agent model configuration and complexity-based tier routing.
+
+Every agent resolves its model here instead of reading ``OPENAI_MODEL``
+directly. A model is resolved in this order:
+
+1. ``OPENAI_MODEL_<AGENT>`` (e.g. ``OPENAI_MODEL_EVALUATOR``) pins one agent.
+2. ``OPENAI_MODEL`` pins every agent (the pre-router behaviour).
+3. The frontline and orchestrator run once per request, with no evaluator
+   retry to escalate on, so they keep their pre-router model: the strong tier.
+4. Otherwise the router picks the fast or strong tier per request.
+
+The router only ever escalates to the strong tier on a retry, i.e. after the
+evaluator has rejected at least one attempt.
+
+All model variables are read on each call, not at import, so values that
+``load_dotenv`` loads after this module is imported still apply.
+"""
+
+import logging
+import os
+from enum import Enum
+
+from agents import ModelProvider, RunConfig
+from pydantic import BaseModel, Field
+
+from agent.models import WorkerType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAST_MODEL = "gpt-4o-mini"
+DEFAULT_STRONG_MODEL = "gpt-5-chat-latest"
+
+LONG_INPUT_CHARS = 2000
+COMPLEX_WORKERS = frozenset({WorkerType.SEARCH, WorkerType.EMAIL})
+STRONG_AGENTS = frozenset({"frontline", "orchestrator"})
+
+AGENT_NAMES = (
+    "frontline",
+    "orchestrator",
+    "evaluator",
+    "search_worker",
+    "email_worker",
+    "general_worker",
+)
+
+_model_provider: ModelProvider | None = None
+
+
+class ModelTier(str, Enum):
+    """Model tiers the router chooses between."""
+
+    FAST = "FAST"
+    STRONG = "STRONG"
+
+
+class RoutingSignals(BaseModel):
+    """Cheap per-request signals used to choose a model tier."""
+
+    input_chars: int = Field(default=0, description="Length of the request text")
+    worker_type: WorkerType | None = Field(default=None, description="Worker handling the task, if any")
+    evaluator_failures: int = Field(default=0, description="Attempts already rejected by the evaluator")
+
+
+def fast_model() -> str:
+    """Return the fast-tier model (``OPENAI_MODEL_FAST``)."""
+    return os.getenv("OPENAI_MODEL_FAST") or DEFAULT_FAST_MODEL
+
+
+def strong_model() -> str:
+    """Return the strong-tier model (``OPENAI_MODEL_STRONG``)."""
+    return os.getenv("OPENAI_MODEL_STRONG") or DEFAULT_STRONG_MODEL
+
+
+def pinned_model(agent_name: str) -> str | None:
+    """Return the model pinned for an agent by environment, if any."""
+    return os.getenv(f"OPENAI_MODEL_{agent_name.upper()}") or os.getenv("OPENAI_MODEL")
+
+
+def default_model(agent_name: str) -> str:
+    """Return the model an agent uses when no signals are available."""
+    if agent_name in STRONG_AGENTS:
+        return pinned_model(agent_name) or strong_model()
+    return pinned_model(agent_name) or fast_model()
+
+
+def complexity(signals: RoutingSignals) -> int:
+    """Score request complexity from cheap signals (0 = trivial)."""
+    score = 0
+    if signals.input_chars > LONG_INPUT_CHARS:
+        score += 1
+    if signals.worker_type in COMPLEX_WORKERS:
+        score += 1
+    return score
+
+
+def select_tier(signals: RoutingSignals) -> ModelTier:
+    """Pick a tier; first attempts always run on the fast tier.
+
+    A complex request escalates on its first retry, anything else only once
+    the evaluator has rejected it twice.
+    """
+    if signals.evaluator_failures == 0:
+        return ModelTier.FAST
+    if signals.evaluator_failures >= 2 or complexity(signals) > 0:
+        return ModelTier.STRONG
+    return ModelTier.FAST
+
+
+def select_model(agent_name: str, signals: RoutingSignals) -> str:
+    """Resolve the model for one agent call."""
+    if agent_name in STRONG_AGENTS:
+        return default_model(agent_name)
+    pinned = pinned_model(agent_name)
+    if pinned:
+        return pinned
+
+    tier = select_tier(signals)
+    model = strong_model() if tier == ModelTier.STRONG else fast_model()
+    logger.info(f"🧭 MODEL_ROUTER: {agent_name} → {model} ({tier.value})")
+    return model
+
+
+def set_model_provider(provider: ModelProvider | None) -> None:
+    """Resolve model names through ``provider``; ``None`` restores OpenAI."""
+    global _model_provider
+    _model_provider = provider
+
+
+def get_model_provider() -> ModelProvider | None:
+    """Return the custom model provider, or ``None`` when using OpenAI."""
+    return _model_provider
+
+
+def run_config(agent_name: str, signals: RoutingSignals | None = None) -> RunConfig:
+    """Build the RunConfig that applies the routed model to a Runner.run call."""
+    model = select_model(agent_name, signals or RoutingSignals())
+    if _model_provider is None:
+        return RunConfig(model=model)
+    return RunConfig(model=model, model_provider=_model_provider)
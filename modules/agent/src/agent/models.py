@@ -35,6 +35,14 @@ class WorkerResult(BaseModel):
     success: bool = Field(description="Whether the worker completed successfully")
     output: str = Field(description="The worker's output content")
     error: str | None = Field(default=None, description="Error message if failed")
+    state: dict[str, Any] = Field(
+        default_factory=dict,
+        description="Intermediate state (fetched data, drafts) passed back to the worker on a retry",
+    )
+    deferred: bool = Field(
+        default=False,
+        description="Output is an unsent draft; the worker is called again with commit=True once it passes",
+    )
 
 
 class EmailParams(BaseModel):
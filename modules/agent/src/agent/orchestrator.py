@@ -1,12 +1,16 @@
 import logging
-import os
 from typing import Any
 
 from agents import Agent, AgentOutputSchema, Runner
 
+from agent.context import record_usage
+from agent.conversation import Conversation
 from agent.evaluator import evaluate
-from agent.models import OrchestratorDecision, WorkerType
+from agent.metrics import stage
+from agent.model_router import default_model, run_config
+from agent.models import OrchestratorDecision, WorkerResult, WorkerType
 from agent.prompts import ORCHESTRATOR_SYSTEM_PROMPT
+from agent.templates import ORCHESTRATOR
 from agent.workers import execute_worker
 
 logger = logging.getLogger(__name__)
@@ -16,14 +20,14 @@ MAX_RETRIES = 3
 _agent = Agent(
     name="Orchestrator",
     instructions=ORCHESTRATOR_SYSTEM_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-5-chat-latest"),
+    model=default_model("orchestrator"),
     output_type=AgentOutputSchema(OrchestratorDecision, strict_json_schema=False),
 )
 
 
 async def process(
     user_input: str,
-    conversation_history: list[dict[str, str]],
+    conversation_history: Conversation,
 ) -> str:
     """Process user input through orchestrator-worker-evaluator flow.
 
@@ -38,7 +42,8 @@ async def process(
     logger.info("▶️  ORCHESTRATOR: Starting request processing")
     logger.info(f"   User input: {user_input[:100]}...")
 
-    decision = await _route(user_input, conversation_history)
+    with stage("route"):
+        decision = await _route(user_input, conversation_history)
 
     logger.info(f"→ ORCHESTRATOR: Routing to {decision.worker_type.value}")
     logger.info(f"   Task: {decision.task_description[:100]}...")
@@ -52,18 +57,28 @@ async def process(
 
 
 async def _execute_with_evaluation(decision: OrchestratorDecision) -> str:
-    """Execute worker with evaluation loop."""
+    """Execute worker with evaluation loop.
+
+    Each retry gets the previous attempt's state so the worker can reuse its
+    fetched data and revise its draft, and the evaluator sees what changed.
+    A deferred result (an unsent email) is committed only once it passes.
+    """
     feedback = None
+    state: dict[str, Any] | None = None
+    previous_output: str | None = None
 
     for attempt in range(MAX_RETRIES):
         logger.info(f"🔄 ORCHESTRATOR: Attempt {attempt + 1}/{MAX_RETRIES}")
 
-        worker_result = await execute_worker(
-            worker_type=decision.worker_type,
-            task_description=decision.task_description,
-            parameters=decision.parameters,
-            feedback=feedback,
-        )
+        with stage("worker"):
+            worker_result = await execute_worker(
+                worker_type=decision.worker_type,
+                task_description=decision.task_description,
+                parameters=decision.parameters,
+                feedback=feedback,
+                failures=attempt,
+                state=state,
+            )
 
         if not worker_result.success:
             logger.error(f"❌ WORKER: Failed with error: {worker_result.error}")
@@ -71,14 +86,24 @@ async def _execute_with_evaluation(decision: OrchestratorDecision) -> str:
 
         logger.info("✓ WORKER: Completed successfully")
 
-        eval_result = await evaluate(
-            worker_output=worker_result.output,
-            task_description=decision.task_description,
-            success_criteria=decision.success_criteria,
-        )
+        with stage("evaluator"):
+            eval_result = await evaluate(
+                worker_output=worker_result.output,
+                task_description=decision.task_description,
+                success_criteria=decision.success_criteria,
+                worker_type=decision.worker_type,
+                failures=attempt,
+                previous_output=previous_output,
+                previous_feedback=feedback,
+            )
 
         if eval_result.passed:
             logger.info(f"✅ EVALUATOR: Passed (score: {eval_result.score}/100)")
+            if worker_result.deferred:
+                worker_result = await _commit(decision, worker_result)
+                if not worker_result.success:
+                    logger.error(f"❌ WORKER: Commit failed with error: {worker_result.error}")
+                    return f"Error: {worker_result.error}"
             logger.info("=" * 50)
             return worker_result.output
 
@@ -86,37 +111,44 @@ async def _execute_with_evaluation(decision: OrchestratorDecision) -> str:
         logger.info(f"   Feedback: {eval_result.feedback[:100]}...")
 
         feedback = f"{eval_result.feedback}\n\nSuggestions: {eval_result.suggestions}"
+        state = worker_result.state
+        previous_output = worker_result.output
 
         if attempt == MAX_RETRIES - 1:
             logger.warning("⚠️  ORCHESTRATOR: Max retries reached, returning partial result")
             logger.info("=" * 50)
+            if worker_result.deferred:
+                return f"{worker_result.output}\n\n[Note: Not sent; the draft did not meet quality criteria after {MAX_RETRIES} attempts. Evaluator feedback: {eval_result.feedback}]"
             return f"{worker_result.output}\n\n[Note: Response may not fully meet quality criteria after {MAX_RETRIES} attempts. Evaluator feedback: {eval_result.feedback}]"
 
     return worker_result.output
 
 
+async def _commit(decision: OrchestratorDecision, draft: WorkerResult) -> WorkerResult:
+    """Have the worker carry out the side effect of its accepted draft."""
+    logger.info("📤 ORCHESTRATOR: Committing accepted draft")
+    with stage("worker"):
+        return await execute_worker(
+            worker_type=decision.worker_type,
+            task_description=decision.task_description,
+            parameters=decision.parameters,
+            state=draft.state,
+            commit=True,
+        )
+
+
 async def _route(
     user_input: str,
-    conversation_history: list[dict[str, str]],
+    conversation_history: Conversation,
 ) -> OrchestratorDecision:
     """Route user input to appropriate worker."""
-    history_context = ""
-    if conversation_history:
-        recent = conversation_history[-6:]
-        history_context = "\n".join(
-            [f"{m['role'].upper()}: {m['content']}" for m in recent]
-        )
-
-    context = f"""Conversation History:
-{history_context}
-
-Current User Request: {user_input}
-
-Analyze this request and determine which worker should handle it."""
+    context = ORCHESTRATOR.render(history=conversation_history.window(6), request=user_input)
 
     result = await Runner.run(
         _agent,
         input=context,
+        run_config=run_config("orchestrator"),
     )
+    record_usage("orchestrator", result)
 
     return result.final_output
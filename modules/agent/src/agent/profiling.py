@@ -0,0 +1,185 @@
+"""Opt-in per-request profiling of a chat run.
+
+A client with the debug token adds ``"debug": "<AGENT_DEBUG_TOKEN>"`` to a
+message frame (WebSocket or ``POST /chat``). That run is then profiled:
+
+- wall-clock stage timings (``agent.metrics.stage``),
+- sampled stacks of the event-loop thread (folded, flamegraph-ready),
+- tracemalloc allocation deltas by source line.
+
+The report arrives as a final ``{"debug": {...}}`` frame after
+``on_chat_model_end``. If ``AGENT_PROFILE_DIR`` is set, it is written there
+instead and the frame carries the file path. The file name uses the
+conversation uuid reduced to safe characters, plus a unique suffix. Requests without the flag skip
+all of this. Without ``AGENT_DEBUG_TOKEN``, profiling is off entirely.
+
+The sampler sees the whole event-loop thread, so samples taken while other
+conversations run concurrently are attributed to this report too.
+"""
+
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+from agent.metrics import collect
+
+DEBUG_TOKEN = os.getenv("AGENT_DEBUG_TOKEN")
+PROFILE_DIR = os.getenv("AGENT_PROFILE_DIR")
+SAMPLE_INTERVAL = 0.005
+MAX_STACK_DEPTH = 20
+TOP = 15
+
+# The uuid comes from the client: keep it from naming a path outside PROFILE_DIR
+_unsafe_name = re.compile(r"[^A-Za-z0-9_-]")
+
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_owned = False
+
+
+def authorized(token: Any) -> bool:
+    """Return True if ``token`` matches ``AGENT_DEBUG_TOKEN`` (never when unset)."""
+    if not DEBUG_TOKEN or not isinstance(token, str):
+        return False
+    return hmac.compare_digest(token.encode(), DEBUG_TOKEN.encode())
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL) -> None:
+        """Sample thread ``thread_id`` every ``interval`` seconds once started."""
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self.leaves: Counter[str] = Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        """Record one stack sample per interval until stopped."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names: list[str] = []
+            while frame is not None and len(names) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.leaves[names[0]] += 1
+                self.stacks[";".join(reversed(names))] += 1
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the thread to exit."""
+        self._stopped.set()
+        self.join()
+
+    def report(self, top: int = TOP) -> dict[str, Any]:
+        """Return the most sampled leaf functions and whole stacks."""
+        return {
+            "samples": sum(self.stacks.values()),
+            "interval_ms": self.interval * 1e3,
+            "top_functions": [{"frame": f, "samples": n} for f, n in self.leaves.most_common(top)],
+            "top_stacks": [{"stack": s, "samples": n} for s, n in self.stacks.most_common(top)],
+        }
+
+
+def start_tracing() -> None:
+    """Start tracemalloc, or join it if another user already did."""
+    # Profiled runs and the memory monitor share tracemalloc; only stop it if we started it
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def stop_tracing() -> None:
+    """Release one ``start_tracing``; tracemalloc stops with the last user."""
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def snapshot() -> tracemalloc.Snapshot:
+    """Take a tracemalloc snapshot without tracemalloc's and importlib's own frames."""
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+    )
+
+
+def allocation_diff(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int = TOP
+) -> list[dict[str, Any]]:
+    """Return the source lines whose allocations grew the most."""
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size_diff / 1024, 1),
+            "count": stat.count_diff,
+        }
+        for stat in after.compare_to(before, "lineno")[:top]
+        if stat.size_diff
+    ]
+
+
+@contextmanager
+def profile(top: int = TOP) -> Iterator[dict[str, Any]]:
+    """Profile the enclosed block; the yielded dict is filled in on exit."""
+    report: dict[str, Any] = {}
+    sampler = StackSampler(threading.get_ident())
+    start_tracing()
+    before = snapshot()
+    wall, cpu = time.perf_counter(), time.process_time()
+    sampler.start()
+    try:
+        with collect() as timings:
+            yield report
+    finally:
+        sampler.stop()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        after = snapshot()
+        stop_tracing()
+        report.update(
+            {
+                "wall_ms": round(wall * 1e3, 1),
+                "process_cpu_ms": round(cpu * 1e3, 1),
+                "stages_ms": {k: round(v * 1e3, 1) for k, v in timings.totals().items()},
+                "cpu": sampler.report(top),
+                "allocations": allocation_diff(before, after, top),
+            }
+        )
+
+
+def deliver(report: dict[str, Any], user_uuid: str | None) -> dict[str, Any]:
+    """Return the debug frame payload, writing the report to a file if configured.
+
+    Raises:
+        OSError: If the report file can't be written
+    """
+    if not PROFILE_DIR:
+        return report
+    directory = Path(PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = _unsafe_name.sub("_", user_uuid or "")[:64] or "anonymous"
+    path = directory / f"{name}-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.json"
+    path.write_text(json.dumps(report, indent=2))
+    return {"profile_file": str(path)}
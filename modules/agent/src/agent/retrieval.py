@@ -0,0 +1,225 @@
+"""Multi-query search: fan out, merge, re-rank and pack into a token budget.
+
+A single query gives research-style tasks thin context, which shows up as
+evaluator failures and retries. ``gather_results`` instead:
+
+1. expands the task into a few query variants (``expand_queries``),
+2. runs them concurrently against the search backend,
+3. merges hits by canonical URL (``canonical_url``),
+4. re-ranks them by BM25 relevance to the task, with a bonus for results
+   several variants agree on, and
+5. keeps the best ones that fit ``AGENT_SEARCH_TOKEN_BUDGET`` (``pack``).
+
+Query expansion is lexical, with no model call, so it adds no model latency.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+from collections import Counter
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from agent.backends import get_search_backend
+
+logger = logging.getLogger(__name__)
+
+MAX_QUERIES = int(os.getenv("AGENT_SEARCH_QUERIES", "4"))
+TOKEN_BUDGET = int(os.getenv("AGENT_SEARCH_TOKEN_BUDGET", "1500"))
+
+# Bonus per additional query variant that returned the same URL
+AGREEMENT_BONUS = 0.5
+
+STOPWORDS = frozenset(
+    "a about an and are as at be by can could do for from find get give how i in into is it "
+    "its look me my of on or please research search show tell that the their this to up us "
+    "was what when where which who why will with you your".split()
+)
+TRACKING_PARAMS = frozenset({"gclid", "fbclid", "mc_cid", "mc_eid", "ref", "ref_src"})
+
+_token = re.compile(r"[a-z0-9]+")
+
+Result = dict[str, str]
+
+
+def terms(text: str) -> list[str]:
+    """Lower-case word tokens of ``text`` without stopwords."""
+    return [t for t in _token.findall(text.lower()) if t not in STOPWORDS]
+
+
+def expand_queries(
+    task_description: str,
+    query: str | None = None,
+    feedback: str | None = None,
+    max_queries: int = MAX_QUERIES,
+) -> list[str]:
+    """Return distinct query variants for a task, most specific first."""
+    candidates = [query or "", task_description, " ".join(terms(query or task_description))]
+    if feedback:
+        # On retries, aim one variant at what the evaluator said was missing
+        candidates.append(" ".join(terms(f"{query or task_description} {feedback}")[:12]))
+    candidates.append(" ".join(terms(task_description)[:6]))
+
+    variants: list[str] = []
+    seen: set[str] = set()
+    for candidate in candidates:
+        key = " ".join(terms(candidate))
+        if key and key not in seen:
+            seen.add(key)
+            variants.append(candidate.strip())
+    return variants[:max_queries]
+
+
+def canonical_url(url: str) -> str:
+    """Normalise a URL for deduplication (scheme, www, tracking params, slashes)."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(
+        sorted(
+            (k, v)
+            for k, v in parse_qsl(parts.query)
+            if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+        )
+    )
+    return urlunsplit(("", host, parts.path.rstrip("/") or "/", query, ""))
+
+
+def _search(query: str, num_results: int) -> list[Result]:
+    results = get_search_backend().search({"q": query, "num": num_results})
+    return [
+        {
+            "title": r.get("title", ""),
+            "link": r.get("link", ""),
+            "snippet": r.get("snippet", ""),
+        }
+        for r in results.get("organic_results", [])[:num_results]
+    ]
+
+
+async def fan_out(queries: list[str], num_results: int) -> list[list[Result]]:
+    """Run queries concurrently (the backends block, so each gets a thread).
+
+    Failed queries are logged and dropped; raises only if every query fails.
+    """
+    responses = await asyncio.gather(
+        *(asyncio.to_thread(_search, q, num_results) for q in queries), return_exceptions=True
+    )
+    ok: list[list[Result]] = []
+    for query, response in zip(queries, responses):
+        if isinstance(response, BaseException):
+            logger.warning(f"🔎 RETRIEVAL: Query '{query}' failed: {response}")
+            continue
+        ok.append(response)
+    if not ok and responses:
+        raise responses[0]  # type: ignore[misc]
+    return ok
+
+
+def merge(result_lists: list[list[Result]]) -> tuple[list[Result], Counter[str]]:
+    """Dedup results by canonical URL, keeping the first (highest-ranked) copy.
+
+    Returns:
+        Unique results and, per canonical URL, how many queries returned it
+    """
+    merged: dict[str, Result] = {}
+    hits: Counter[str] = Counter()
+    for results in result_lists:
+        for result in results:
+            key = canonical_url(result["link"])
+            hits[key] += 1
+            merged.setdefault(key, result)
+    return list(merged.values()), hits
+
+
+def rank(
+    results: list[Result],
+    task: str,
+    hits: Counter[str] | None = None,
+    k1: float = 1.2,
+    b: float = 0.75,
+) -> list[Result]:
+    """Order results by BM25 score of title and snippet against ``task``."""
+    if not results:
+        return []
+    docs = [terms(f"{r['title']} {r['snippet']}") for r in results]
+    avgdl = sum(len(d) for d in docs) / len(docs) or 1.0
+    df = Counter(t for d in docs for t in set(d))
+    query = set(terms(task))
+
+    def score(i: int) -> float:
+        tf = Counter(docs[i])
+        norm = k1 * (1 - b + b * len(docs[i]) / avgdl)
+        bm25 = sum(
+            math.log(1 + (len(docs) - df[t] + 0.5) / (df[t] + 0.5)) * tf[t] * (k1 + 1) / (tf[t] + norm)
+            for t in query
+            if t in tf
+        )
+        agreement = (hits[canonical_url(results[i]["link"])] - 1) if hits else 0
+        return bm25 + AGREEMENT_BONUS * agreement
+
+    # Stable sort: ties keep the backend's order
+    order = sorted(range(len(results)), key=score, reverse=True)
+    return [results[i] for i in order]
+
+
+def _format(i: int, result: Result) -> str:
+    return f"{i}. {result['title']}\n   {result['link']}\n   {result['snippet']}"
+
+
+def pack(results: list[Result], budget: int = TOKEN_BUDGET) -> str:
+    """Format the best results that fit in ``budget`` tokens (~4 chars each)."""
+    entries: list[str] = []
+    used = 0
+    for result in results:
+        entry = _format(len(entries) + 1, result)
+        cost = len(entry) // 4 + 1
+        if used + cost > budget:
+            if entries:
+                break
+            entry = entry[: budget * 4]  # always keep something from the top hit
+        entries.append(entry)
+        used += cost
+    return "\n\n".join(entries)
+
+
+async def gather_results(
+    task_description: str,
+    query: str | None = None,
+    feedback: str | None = None,
+    num_results: int = 5,
+    budget: int = TOKEN_BUDGET,
+    prior: dict[str, Any] | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Run the full pipeline for a task.
+
+    Args:
+        task_description: Task to research (also what results are ranked against)
+        query: Query chosen by the orchestrator, if any
+        feedback: Evaluator feedback from a previous attempt
+        num_results: Results fetched per query variant
+        budget: Token budget for the packed context
+        prior: State returned by an earlier call for the same task; its
+            results are reused and only new query variants are run
+
+    Returns:
+        Packed search context, and state (queries run, results, hit counts)
+            to pass back as ``prior`` on a retry
+    """
+    prior = prior or {}
+    done = prior.get("queries", [])
+    queries = [q for q in expand_queries(task_description, query, feedback) if q not in done]
+    logger.info(f"🔎 RETRIEVAL: {len(queries)} new queries: {queries}")
+
+    results: list[Result] = list(prior.get("results", []))
+    hits: Counter[str] = Counter(prior.get("hits", {}))
+    if queries:
+        new, new_hits = merge(await fan_out(queries, num_results))
+        known = set(hits)
+        results += [r for r in new if canonical_url(r["link"]) not in known]
+        hits.update(new_hits)
+
+    ranked = rank(results, f"{task_description} {query or ''}", hits)
+    logger.info(f"🔎 RETRIEVAL: {sum(hits.values())} hits → {len(ranked)} unique")
+    return pack(ranked, budget), {"queries": done + queries, "results": ranked, "hits": dict(hits)}
@@ -5,13 +5,15 @@
 import json
 import logging
 import os
-from typing import Dict, List
+from typing import Dict, List, Protocol
 
 from dotenv import load_dotenv
-from fastapi import WebSocket
 
+from agent.conversation import Conversation
 from agent.frontline import process as frontline_process
+from agent.metrics import stage
 from agent.orchestrator import process as orchestrator_process
+from agent.store import get_store, open_store, set_store
 
 # -----------------------------------------------------------------------------
 # Setup
@@ -19,23 +21,70 @@ from agent.orchestrator import process as orchestrator_process
 logger = logging.getLogger("app.runner")
 load_dotenv(override=True)
 
+# AGENT_OFFLINE=1 swaps the model provider and upstream APIs for local fakes
+OFFLINE = os.getenv("AGENT_OFFLINE") == "1"
+if OFFLINE:
+    from agent.fakes import FakeSettings, install_fakes
+
+    install_fakes(FakeSettings.model_validate_json(os.getenv("AGENT_FAKE_SETTINGS") or "{}"))
+    logger.warning("AGENT_OFFLINE is set: using fake model provider and backends.")
+
+# AGENT_CASSETTE_MODE=record|replay captures or serves upstream calls on disk
+CASSETTE_MODE = os.getenv("AGENT_CASSETTE_MODE")
+if CASSETTE_MODE:
+    from agent.cassette import install_cassette
+
+    install_cassette(
+        CASSETTE_MODE,
+        os.getenv("AGENT_CASSETTE_DIR", "cassettes"),
+        timing=os.getenv("AGENT_CASSETTE_TIMING") == "1",
+    )
+
+# AGENT_STORE_URL shares conversations across worker processes (see agent/store.py)
+STORE_URL = os.getenv("AGENT_STORE_URL")
+if STORE_URL:
+    set_store(open_store(STORE_URL))
+
 API_KEY = os.getenv("OPENAI_API_KEY")
-if not API_KEY:
+if not API_KEY and not OFFLINE and CASSETTE_MODE != "replay":
     logger.warning("OPENAI_API_KEY is missing. Agent will not function until configured.")
 
 # -----------------------------------------------------------------------------
 # In-memory conversation storage (keyed by user_uuid)
 # -----------------------------------------------------------------------------
-_conversations: Dict[str, List[Dict[str, str]]] = {}
+_conversations: Dict[str, Conversation] = {}
 
 
-def get_conversation(user_uuid: str) -> List[Dict[str, str]]:
+def get_conversation(user_uuid: str) -> Conversation:
     """Get or create conversation history for a user."""
     if user_uuid not in _conversations:
-        _conversations[user_uuid] = []
+        _conversations[user_uuid] = Conversation()
     return _conversations[user_uuid]
 
 
+async def sync_conversation(user_uuid: str) -> Conversation:
+    """Get a conversation, first pulling messages other workers appended."""
+    conversation = get_conversation(user_uuid)
+    store = get_store()
+    if store is not None:
+        for seq, role, content in await store.load(user_uuid, len(conversation)):
+            # Another task may have pulled the same rows while we awaited
+            if seq == len(conversation) + 1:
+                conversation.append(role, content)
+    return conversation
+
+
+async def append_message(user_uuid: str, role: str, content: str) -> Conversation:
+    """Append a message, through the shared store when one is configured."""
+    store = get_store()
+    if store is None:
+        conversation = get_conversation(user_uuid)
+        conversation.append(role, content)
+        return conversation
+    await store.append(user_uuid, role, content)
+    return await sync_conversation(user_uuid)
+
+
 def _extract_user_input(data: str | List[Dict[str, str]]) -> str:
     """Extract user input from message data."""
     if not isinstance(data, list):
@@ -46,26 +95,42 @@ def _extract_user_input(data: str | List[Dict[str, str]]) -> str:
     return user_messages[-1]["content"]
 
 
+class FrameSink(Protocol):
+    """Anything frames can be sent to: a WebSocket or a ChatRun buffer."""
+
+    async def send_text(self, data: str) -> None: ...
+
+
+async def emit_stream(sink: FrameSink, text: str) -> None:
+    """Send an ``on_chat_model_stream`` frame."""
+    await sink.send_text(json.dumps({"on_chat_model_stream": text}))
+
+
+async def emit_end(sink: FrameSink) -> None:
+    """Send the ``on_chat_model_end`` frame that closes a response."""
+    await sink.send_text(json.dumps({"on_chat_model_end": True}))
+
+
 # -----------------------------------------------------------------------------
-# WebSocket entrypoint (called by server.py)
+# Chat entrypoint (called by server.py through agent.runs)
 # -----------------------------------------------------------------------------
 async def handle_chat(
-    websocket: WebSocket, data: str | List[Dict[str, str]], user_uuid: str
+    websocket: FrameSink, data: str | List[Dict[str, str]], user_uuid: str
 ):
     """
     Main entry point called by server.py.
     Routes through orchestrator-worker-evaluator pattern.
 
     Args:
-        websocket: FastAPI WebSocket connection
+        websocket: Frame sink (FastAPI WebSocket or ChatRun replay buffer)
         data: User message (string) or list of messages
         user_uuid: Conversation identifier for memory
     """
-    if not API_KEY:
+    if not API_KEY and not OFFLINE and CASSETTE_MODE != "replay":
         logger.warning("handle_chat called without API_KEY configured")
         error_msg = "OPENAI_API_KEY is not configured. Please set it in your environment."
-        await websocket.send_text(json.dumps({"on_chat_model_stream": error_msg}))
-        await websocket.send_text(json.dumps({"on_chat_model_end": True}))
+        await emit_stream(websocket, error_msg)
+        await emit_end(websocket)
         return
 
     user_input = _extract_user_input(data)
@@ -75,37 +140,33 @@ async def handle_chat(
 
     logger.info(f"Processing message: {user_input[:50]}")
 
-    conversation = get_conversation(user_uuid)
-    conversation.append({"role": "user", "content": user_input})
+    conversation = await append_message(user_uuid, "user", user_input)
 
     try:
-        should_route, result = await frontline_process(user_input, conversation)
+        with stage("frontline"):
+            should_route, result = await frontline_process(user_input, conversation)
 
         if not should_route:
             logger.info("Frontline handled directly")
             response = result
-            await websocket.send_text(json.dumps({"on_chat_model_stream": response}))
-            await websocket.send_text(json.dumps({"on_chat_model_end": True}))
-            conversation.append({"role": "assistant", "content": response})
+            await emit_stream(websocket, response)
+            await emit_end(websocket)
+            await append_message(user_uuid, "assistant", response)
             return
 
         logger.info("Routing to orchestrator for specialized processing")
-        await websocket.send_text(
-            json.dumps({"on_chat_model_stream": "Processing your request..."})
-        )
+        await emit_stream(websocket, "Processing your request...")
 
         response = await orchestrator_process(user_input, conversation)
 
-        await websocket.send_text(json.dumps({"on_chat_model_stream": "\n\n"}))
-        await websocket.send_text(json.dumps({"on_chat_model_stream": response}))
-        await websocket.send_text(json.dumps({"on_chat_model_end": True}))
-        conversation.append({"role": "assistant", "content": response})
+        await emit_stream(websocket, "\n\n")
+        await emit_stream(websocket, response)
+        await emit_end(websocket)
+        await append_message(user_uuid, "assistant", response)
 
     except Exception as e:
         logger.exception(f"Agent run failed: {e}")
         error_msg = "Sorry—there was an error generating the response."
-        await websocket.send_text(
-            json.dumps({"on_chat_model_stream": error_msg})
-        )
-        await websocket.send_text(json.dumps({"on_chat_model_end": True}))
-        conversation.append({"role": "assistant", "content": error_msg})
+        await emit_stream(websocket, error_msg)
+        await emit_end(websocket)
+        await append_message(user_uuid, "assistant", error_msg)
@@ -0,0 +1,190 @@
+"""Chat runs detached from the WebSocket that started them.
+
+Each message starts a ``ChatRun``: ``handle_chat`` runs as a background task
+and every frame it emits is appended to the run's replay buffer. Sockets
+follow a run from a frame offset, so a client that drops mid-run can
+reconnect with the same uuid and either attach to the in-flight run or fetch
+the finished result, without paying for the pipeline again.
+
+Both transports read runs the same way: ``/ws`` sends each frame as a text
+message, and ``POST /chat`` sends it as a Server-Sent Event (``sse``) whose
+id is the frame offset, so ``Last-Event-ID`` resumes where a client left off.
+
+Runs are kept in a bounded registry, keyed by conversation uuid (latest run
+per uuid). Finished runs expire after ``AGENT_RUN_TTL`` seconds, and at most
+``AGENT_RUN_REGISTRY_SIZE`` runs are retained. In-flight runs are never
+evicted. With a shared store (``AGENT_STORE_URL``) finished runs are also
+saved there, so a client reconnecting to a different worker process can
+still fetch the result. In-flight runs are only visible to their own worker:
+``start`` marks the run in flight in the store first, so other workers find
+nothing rather than the conversation's previous run.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import nullcontext
+from typing import Any
+
+from agent import profiling
+from agent.runner import handle_chat
+from agent.store import get_store
+
+logger = logging.getLogger(__name__)
+
+RUN_TTL = float(os.getenv("AGENT_RUN_TTL", "300"))
+RUN_REGISTRY_SIZE = int(os.getenv("AGENT_RUN_REGISTRY_SIZE", "1000"))
+
+
+class ChatRun:
+    """One ``handle_chat`` invocation and the frames it has emitted."""
+
+    __slots__ = ("user_uuid", "run_id", "frames", "done", "finished_at", "_changed")
+
+    def __init__(self, user_uuid: str) -> None:
+        """Create an empty, unfinished run for conversation ``user_uuid``."""
+        self.user_uuid = user_uuid
+        self.run_id = uuid.uuid4().hex
+        self.frames: list[str] = []
+        self.done = False
+        self.finished_at: float | None = None
+        self._changed = asyncio.Condition()
+
+    async def send_text(self, data: str) -> None:
+        """Append a frame (``handle_chat`` sends here instead of a socket)."""
+        async with self._changed:
+            self.frames.append(data)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        """Mark the run done and wake its followers."""
+        async with self._changed:
+            self.done = True
+            self.finished_at = time.monotonic()
+            self._changed.notify_all()
+
+    async def follow(self, offset: int = 0) -> AsyncIterator[str]:
+        """Yield frames from ``offset`` on, waiting for new ones until done."""
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.frames) > offset or self.done)
+                pending = self.frames[offset:]
+                done = self.done
+            for frame in pending:
+                yield frame
+            offset += len(pending)
+            if done:
+                return
+
+
+async def sse(run: ChatRun, offset: int = 0) -> AsyncIterator[str]:
+    """Yield a run's frames as Server-Sent Events, ids being frame offsets."""
+    async for frame in run.follow(offset):
+        offset += 1
+        yield f"id: {offset}\ndata: {frame}\n\n"
+
+
+class RunRegistry:
+    """Bounded map of conversation uuid to its latest run."""
+
+    def __init__(self, max_runs: int = RUN_REGISTRY_SIZE, ttl: float = RUN_TTL) -> None:
+        """Keep at most ``max_runs`` runs, expiring finished ones after ``ttl`` seconds."""
+        self.max_runs = max_runs
+        self.ttl = ttl
+        self._runs: OrderedDict[str, ChatRun] = OrderedDict()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def __len__(self) -> int:
+        """Return the number of runs retained."""
+        return len(self._runs)
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of runs still executing."""
+        return len(self._tasks)
+
+    async def start(self, user_uuid: str, data: Any, profile: bool = False) -> ChatRun:
+        """Start ``handle_chat`` for a message as a detached run.
+
+        With ``profile``, the run ends with a ``debug`` frame holding its
+        profile (see ``agent.profiling``).
+        """
+        run = ChatRun(user_uuid)
+        store = get_store()
+        if store is not None:
+            try:
+                await store.begin_run(user_uuid, run.run_id, self.ttl)
+            except Exception as e:
+                # Other workers may then serve the previous run; this one still runs
+                logger.error(f"❌ RUNS: Failed to mark run {user_uuid} in flight in the store: {e}")
+        task = asyncio.create_task(self._execute(run, data, profile))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        self._runs[user_uuid] = run
+        self._runs.move_to_end(user_uuid)
+        self._evict()
+        return run
+
+    async def _execute(self, run: ChatRun, data: Any, profile: bool = False) -> None:
+        try:
+            with profiling.profile() if profile else nullcontext() as report:
+                await handle_chat(run, data, run.user_uuid)
+            if report is not None:
+                try:
+                    debug = profiling.deliver(report, run.user_uuid)
+                except OSError as e:
+                    logger.error(f"❌ RUNS: Failed to write profile for {run.user_uuid}: {e}")
+                    debug = {"error": f"Failed to write profile: {e}"}
+                await run.send_text(json.dumps({"debug": debug}))
+        finally:
+            await run.finish()
+            store = get_store()
+            if store is not None:
+                try:
+                    await store.save_run(run.user_uuid, run.run_id, run.frames, self.ttl)
+                except Exception as e:
+                    # The run is still served from this worker; only other workers miss it
+                    logger.error(f"❌ RUNS: Failed to save run {run.user_uuid} to the store: {e}")
+
+    def get(self, user_uuid: str) -> ChatRun | None:
+        """Return the latest run for a uuid, unless it has expired."""
+        self._evict()
+        return self._runs.get(user_uuid)
+
+    async def find(self, user_uuid: str) -> ChatRun | None:
+        """Like ``get``, falling back to finished runs in the shared store."""
+        run = self.get(user_uuid)
+        store = get_store()
+        if run is not None or store is None:
+            return run
+        frames = await store.load_run(user_uuid)
+        if frames is None:
+            return None
+        run = ChatRun(user_uuid)
+        run.frames = frames
+        await run.finish()
+        return run
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key, run in list(self._runs.items()):
+            expired = run.finished_at is not None and now - run.finished_at > self.ttl
+            over = len(self._runs) > self.max_runs
+            if not (expired or (over and run.done)):
+                continue
+            del self._runs[key]
+
+    async def cancel_all(self) -> None:
+        """Cancel in-flight runs (server shutdown)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+runs = RunRegistry()
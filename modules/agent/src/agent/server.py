@@ -5,30 +5,107 @@
 #   - handle each frame via a helper
 #   - errors logged; socket closed on exit
 
+import asyncio
 import json
 import logging
+import os
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Any
 
-from fastapi import FastAPI, WebSocket
-from agent.runner import handle_chat
+from fastapi import FastAPI, Header, HTTPException, Query, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from agent import memory, templates
+from agent.batch import (
+    SERVER_BATCH_CONCURRENCY,
+    parse_requests,
+    run_batch,
+    server_limiter,
+)
 from agent.logging_config import configure_logging
+from agent.profiling import authorized
+from agent.runs import ChatRun, runs, sse
+from agent.workers import preload_workers
 
 # -----------------------------------------------------------------------------
 # App + logging
 # -----------------------------------------------------------------------------
 configure_logging()  # plain logging to stdout (Docker captures it)
 logger = logging.getLogger("app.server")
-app = FastAPI()
+
+PRELOAD_WORKERS = os.getenv("AGENT_PRELOAD_WORKERS", "1") != "0"
+
+# Open sockets and the tracemalloc monitor, for GET /admin/memory
+_sockets: set[WebSocket] = set()
+_monitor: memory.SnapshotMonitor | None = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Validate prompts and start background tasks; stop them on shutdown."""
+    global _monitor
+    # Fail at boot, not mid-request, if a prompt no longer matches what we parse
+    templates.check_and_log()
+    # Workers are imported lazily; warm them in the background once serving
+    preload = asyncio.create_task(preload_workers()) if PRELOAD_WORKERS else None
+    snapshots = None
+    if memory.SNAPSHOT_INTERVAL > 0:
+        _monitor = memory.SnapshotMonitor()
+        snapshots = asyncio.create_task(_monitor.run())
+    yield
+    if preload and not preload.done():
+        preload.cancel()
+    if snapshots:
+        snapshots.cancel()
+        await asyncio.gather(snapshots, return_exceptions=True)
+        _monitor = None
+    await runs.cancel_all()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+def _redact(payload: Any) -> Any:
+    # The debug flag carries AGENT_DEBUG_TOKEN, which also gates /admin/memory
+    if isinstance(payload, dict) and "debug" in payload:
+        return {**payload, "debug": "***"}
+    return payload
+
+
+def _debug(payload: dict[str, Any], uid: str | None) -> bool:
+    # Profiling is opt-in per message and only for holders of AGENT_DEBUG_TOKEN
+    token = payload.get("debug")
+    if token is None:
+        return False
+    if not authorized(token):
+        logger.warning(json.dumps({
+            "timestamp": datetime.now().isoformat(),
+            "uuid": uid,
+            "op": "Ignoring unauthorized debug flag."
+        }))
+        return False
+    return True
 
 
 # -----------------------------------------------------------------------------
 # WebSocket endpoint (frontend connects here)
 # -----------------------------------------------------------------------------
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket) -> None:
+    """Chat over a WebSocket: one run per message frame, resumable by uuid."""
     await websocket.accept()
+    _sockets.add(websocket)
     user_uuid: str | None = None
 
+    async def follow(run: ChatRun, offset: int) -> None:
+        # Stream the run's frames; if this socket drops, the run keeps going
+        async for frame in run.follow(offset):
+            await websocket.send_text(frame)
+
     async def handle_frame(raw: str, uid: str | None) -> str | None:
         # Parse JSON; on error, log and return
         try:
@@ -41,11 +118,11 @@ async def websocket_endpoint(websocket: WebSocket):
             }))
             return uid
 
-        # Log what we received
+        # Log what we received (never the debug token)
         logger.info(json.dumps({
             "timestamp": datetime.now().isoformat(),
             "uuid": uid,
-            "received": payload
+            "received": _redact(payload)
         }))
 
         # Track conversation id if provided
@@ -60,13 +137,33 @@ async def websocket_endpoint(websocket: WebSocket):
             }))
             return new_uid
 
+        # Reconnect: attach to the in-flight (or finished) run from an offset
+        if payload.get("resume"):
+            offset = payload.get("offset", 0)
+            if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+                await websocket.send_text(json.dumps({"resume_error": "Invalid offset"}))
+                return new_uid
+            run = await runs.find(new_uid) if new_uid else None
+            if run is None:
+                await websocket.send_text(json.dumps({"resume_error": "No run to resume"}))
+                return new_uid
+            logger.info(json.dumps({
+                "timestamp": datetime.now().isoformat(),
+                "uuid": new_uid,
+                "op": f"Resuming run at frame {offset}."
+            }))
+            await follow(run, offset)
+            return new_uid
+
         # No message? Nothing to do
         message = payload.get("message")
         if not message:
             return new_uid
 
-        # We have a message: invoke the graph (it streams back over this WS)
-        await handle_chat(websocket, message, new_uid)
+        # We have a message: start a detached run and stream it back over this WS.
+        # Without a client uuid the socket gets its own conversation.
+        new_uid = new_uid or str(uuid.uuid4())
+        await follow(await runs.start(new_uid, message, profile=_debug(payload, new_uid)), 0)
         return new_uid
 
     try:
@@ -81,6 +178,7 @@ async def websocket_endpoint(websocket: WebSocket):
         }))
 
     finally:
+        _sockets.discard(websocket)
         if user_uuid:
             logger.info(json.dumps({
                 "timestamp": datetime.now().isoformat(),
@@ -97,6 +195,99 @@ async def websocket_endpoint(websocket: WebSocket):
             }))
 
 
+# -----------------------------------------------------------------------------
+# HTTP streaming (Server-Sent Events; same frames as /ws)
+# -----------------------------------------------------------------------------
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class ChatRequest(BaseModel):
+    """Body of ``POST /chat``."""
+
+    uuid: str | None = Field(default=None, description="Conversation id; a new one is assigned if omitted")
+    message: str = Field(description="User message to process")
+    debug: str | None = Field(default=None, description="AGENT_DEBUG_TOKEN, to profile this run")
+
+
+def _event_stream(run: ChatRun, user_uuid: str, offset: int) -> StreamingResponse:
+    return StreamingResponse(
+        sse(run, offset),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Conversation-Id": user_uuid},
+    )
+
+
+@app.post("/chat")
+async def chat_endpoint(chat: ChatRequest) -> StreamingResponse:
+    """Start a run for one message and stream its frames as Server-Sent Events."""
+    # Stateless clients: one request per message, conversation kept by uuid
+    user_uuid = chat.uuid or str(uuid.uuid4())
+    logger.info(json.dumps({
+        "timestamp": datetime.now().isoformat(),
+        "uuid": user_uuid,
+        "op": "HTTP chat message."
+    }))
+    run = await runs.start(user_uuid, chat.message, profile=_debug(chat.model_dump(), user_uuid))
+    return _event_stream(run, user_uuid, 0)
+
+
+@app.get("/chat/{user_uuid}")
+async def chat_resume_endpoint(
+    user_uuid: str,
+    offset: int = Query(default=0, ge=0),
+    last_event_id: int | None = Header(default=None, ge=0),
+) -> StreamingResponse:
+    """Resume streaming a conversation's latest run from a frame offset."""
+    # EventSource reconnects send Last-Event-ID; explicit clients pass ?offset=
+    run = await runs.find(user_uuid)
+    if run is None:
+        raise HTTPException(status_code=404, detail="No run to resume")
+    return _event_stream(run, user_uuid, last_event_id if last_event_id is not None else offset)
+
+
+# -----------------------------------------------------------------------------
+# Batch endpoint (JSONL in, JSONL out; shares AGENT_BATCH_CONCURRENCY slots)
+# -----------------------------------------------------------------------------
+@app.post("/batch")
+async def batch_endpoint(
+    request: Request,
+    concurrency: int = Query(default=SERVER_BATCH_CONCURRENCY, ge=1, le=SERVER_BATCH_CONCURRENCY),
+) -> StreamingResponse:
+    """Process a JSONL body of requests, streaming JSONL results as they finish."""
+    # More workers than the shared slots would only queue on the limiter
+    body = (await request.body()).decode()
+    try:
+        requests = list(parse_requests(body.splitlines()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    logger.info(json.dumps({
+        "timestamp": datetime.now().isoformat(),
+        "op": f"Batch of {len(requests)} requests."
+    }))
+
+    async def results() -> AsyncIterator[str]:
+        async for result in run_batch(requests, concurrency, limiter=server_limiter()):
+            yield result.model_dump_json() + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# -----------------------------------------------------------------------------
+# Admin: memory accounting (requires AGENT_DEBUG_TOKEN in X-Debug-Token)
+# -----------------------------------------------------------------------------
+@app.get("/admin/memory")
+async def memory_endpoint(
+    top: int = 15, snapshot: bool = False, x_debug_token: str | None = Header(default=None)
+) -> dict[str, Any]:
+    """Report per-subsystem memory use (requires the debug token)."""
+    if not authorized(x_debug_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    if snapshot and _monitor is not None:
+        await _monitor.take()
+    return await memory.report(runs, len(_sockets), _monitor, top)
+
+
 # -----------------------------------------------------------------------------
 # Local dev entrypoint (uvicorn)
 # -----------------------------------------------------------------------------
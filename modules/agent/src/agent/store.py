@@ -0,0 +1,252 @@
+"""Shared conversation state for multi-process deployments.
+
+By default every uvicorn worker keeps conversations in its own memory, so
+``--workers`` breaks continuity. With ``AGENT_STORE_URL`` set, conversation
+messages and finished run buffers live in a store shared by all workers:
+
+- ``sqlite:///path/to/agent.db``: a local SQLite file in WAL mode
+- ``redis://host:6379/0``: any Redis-protocol server (needs ``redis``)
+
+Each process still keeps its ``Conversation`` objects (with their rendered
+history windows) and only pulls the messages appended after what it already
+has. Appends take a per-conversation sequence number atomically (``BEGIN
+IMMEDIATE`` in SQLite, ``RPUSH`` in Redis), so concurrent writers from
+different workers can't interleave or lose messages.
+
+Runs are stored under their conversation with a per-run id. ``begin_run``
+records the latest run as in flight before it starts, and ``save_run`` only
+fills in the frames while that run is still the latest. So another worker
+never serves the previous turn's answer for a run that is still executing.
+
+Only conversations and finished runs are shared. The remaining in-process
+caches stay per worker, either because they are rebuilt from shared state
+(history windows) or because they are per-process statistics or code
+(prompt-cache accounting in ``agent.context``, the lazy worker registry).
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Protocol
+
+# (seq, role, content); seq starts at 1 within a conversation
+Row = tuple[int, str, str]
+
+
+class Store(Protocol):
+    """Conversation messages and finished runs shared by worker processes."""
+
+    async def append(self, conversation: str, role: str, content: str) -> int:
+        """Append a message and return its sequence number."""
+        ...
+
+    async def load(self, conversation: str, after: int = 0) -> list[Row]:
+        """Return the messages with sequence numbers above ``after``, in order."""
+        ...
+
+    async def begin_run(self, conversation: str, run_id: str, ttl: float) -> None:
+        """Record ``run_id`` as the conversation's latest run, in flight, for ``ttl`` seconds."""
+        ...
+
+    async def save_run(self, conversation: str, run_id: str, frames: list[str], ttl: float) -> None:
+        """Keep a finished run's frames for ``ttl`` seconds, unless a newer run began."""
+        ...
+
+    async def load_run(self, conversation: str) -> list[str] | None:
+        """Return the latest run's frames, unless it is in flight, missing or expired."""
+        ...
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    conversation TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (conversation, seq)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    conversation TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    frames TEXT,
+    expires_at REAL NOT NULL
+);
+"""
+
+
+class SQLiteStore:
+    """Store in a local SQLite database (WAL mode, one connection per thread)."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open (creating if needed) the database at ``path``."""
+        self.path = str(path)
+        self._local = threading.local()
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.executescript(_SCHEMA)
+
+    def _db(self) -> sqlite3.Connection:
+        db: sqlite3.Connection | None = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit mode; writes take the lock explicitly with BEGIN IMMEDIATE
+            db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _append(self, conversation: str, role: str, content: str) -> int:
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            (seq,) = db.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM messages WHERE conversation = ?",
+                (conversation,),
+            ).fetchone()
+            db.execute(
+                "INSERT INTO messages VALUES (?, ?, ?, ?)", (conversation, seq, role, content)
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return int(seq)
+
+    def _load(self, conversation: str, after: int) -> list[Row]:
+        return self._db().execute(
+            "SELECT seq, role, content FROM messages WHERE conversation = ? AND seq > ? ORDER BY seq",
+            (conversation, after),
+        ).fetchall()
+
+    def _begin_run(self, conversation: str, run_id: str, ttl: float) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, NULL, ?)",
+            (conversation, run_id, time.time() + ttl),
+        )
+
+    def _save_run(self, conversation: str, run_id: str, frames: list[str], ttl: float) -> None:
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired rows are never read again; drop them here rather than let them pile up
+            db.execute("DELETE FROM runs WHERE expires_at <= ?", (now,))
+            # A row for another run id means a newer run began; leave it alone
+            db.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?) ON CONFLICT (conversation) DO UPDATE "
+                "SET frames = excluded.frames, expires_at = excluded.expires_at "
+                "WHERE runs.run_id = excluded.run_id",
+                (conversation, run_id, json.dumps(frames), now + ttl),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _load_run(self, conversation: str) -> list[str] | None:
+        row = self._db().execute(
+            "SELECT frames FROM runs WHERE conversation = ? AND expires_at > ?",
+            (conversation, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    async def append(self, conversation: str, role: str, content: str) -> int:
+        """Append a message and return its sequence number."""
+        return await asyncio.to_thread(self._append, conversation, role, content)
+
+    async def load(self, conversation: str, after: int = 0) -> list[Row]:
+        """Return the messages with sequence numbers above ``after``, in order."""
+        return await asyncio.to_thread(self._load, conversation, after)
+
+    async def begin_run(self, conversation: str, run_id: str, ttl: float) -> None:
+        """Record ``run_id`` as the conversation's latest run, in flight, for ``ttl`` seconds."""
+        await asyncio.to_thread(self._begin_run, conversation, run_id, ttl)
+
+    async def save_run(self, conversation: str, run_id: str, frames: list[str], ttl: float) -> None:
+        """Keep a finished run's frames for ``ttl`` seconds, unless a newer run began."""
+        await asyncio.to_thread(self._save_run, conversation, run_id, frames, ttl)
+
+    async def load_run(self, conversation: str) -> list[str] | None:
+        """Return the latest run's frames, unless it is in flight, missing or expired."""
+        return await asyncio.to_thread(self._load_run, conversation)
+
+
+class RedisStore:
+    """Store in a Redis-protocol server (Redis, Valkey, or a local stand-in)."""
+
+    def __init__(self, url: str, prefix: str = "agent") -> None:
+        """Connect to ``url``; keys are namespaced under ``prefix``."""
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, kind: str, conversation: str) -> str:
+        return f"{self.prefix}:{kind}:{conversation}"
+
+    async def append(self, conversation: str, role: str, content: str) -> int:
+        """Append a message and return its sequence number."""
+        # RPUSH is atomic and returns the new length, which is the sequence number
+        return int(await self._redis.rpush(self._key("conv", conversation), json.dumps([role, content])))
+
+    async def load(self, conversation: str, after: int = 0) -> list[Row]:
+        """Return the messages with sequence numbers above ``after``, in order."""
+        raw = await self._redis.lrange(self._key("conv", conversation), after, -1)
+        return [(after + i, *json.loads(item)) for i, item in enumerate(raw, 1)]
+
+    async def begin_run(self, conversation: str, run_id: str, ttl: float) -> None:
+        """Record ``run_id`` as the conversation's latest run, in flight, for ``ttl`` seconds."""
+        run = json.dumps({"id": run_id, "frames": None})
+        await self._redis.set(self._key("run", conversation), run, ex=max(1, int(ttl)))
+
+    async def save_run(self, conversation: str, run_id: str, frames: list[str], ttl: float) -> None:
+        """Keep a finished run's frames for ``ttl`` seconds (whole seconds, at least 1), unless a newer run began."""
+        from redis.exceptions import WatchError
+
+        key = self._key("run", conversation)
+        run = json.dumps({"id": run_id, "frames": frames})
+        async with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    # Optimistic check-and-set: retried if another worker touches the key meanwhile
+                    await pipe.watch(key)
+                    current = await pipe.get(key)
+                    if current and json.loads(current)["id"] != run_id:
+                        return
+                    pipe.multi()
+                    pipe.set(key, run, ex=max(1, int(ttl)))
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    async def load_run(self, conversation: str) -> list[str] | None:
+        """Return the latest run's frames, unless it is in flight, missing or expired."""
+        raw = await self._redis.get(self._key("run", conversation))
+        frames: list[str] | None = json.loads(raw)["frames"] if raw else None
+        return frames
+
+
+def open_store(url: str) -> Store:
+    """Open a store from an ``AGENT_STORE_URL``."""
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url.removeprefix("sqlite:///"))
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    raise ValueError(f"unsupported store URL {url!r}")
+
+
+_store: Store | None = None
+
+
+def get_store() -> Store | None:
+    """Return the shared store, or None when state is per-process."""
+    return _store
+
+
+def set_store(store: Store | None) -> None:
+    """Install a shared store (None restores per-process state)."""
+    global _store
+    _store = store
@@ -0,0 +1,203 @@
+r"""Precompiled agent context templates, versioned and validated at startup.
+
+Each agent's input is a ``Template``: its static instruction block followed
+by named slots, each rendered as a ``Title:\nbody`` section when non-empty,
+in the most-to-least-stable order ``agent.context`` describes for provider
+prompt caching. Section headers are built once, so rendering is a single join.
+
+``validate`` runs at server startup. It checks every template and system
+prompt against the structured outputs the code parses (``OrchestratorDecision``,
+``EvaluatorResult``, ``EmailParams``, the frontline JSON). A prompt edit that
+drops a field therefore fails at boot, not under load. ``versions`` returns a
+short sha256 per template and prompt, logged at startup so a behaviour change
+can be traced to a prompt change.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from collections.abc import Sequence
+
+from pydantic import BaseModel
+
+from agent.context import (
+    EMAIL_WORKER_INSTRUCTION,
+    EVALUATOR_INSTRUCTION,
+    FRONTLINE_INSTRUCTION,
+    GENERAL_WORKER_INSTRUCTION,
+    ORCHESTRATOR_INSTRUCTION,
+    SEARCH_WORKER_INSTRUCTION,
+)
+from agent.models import EmailParams, EvaluatorResult, OrchestratorDecision, WorkerType
+from agent.prompts import (
+    EMAIL_WORKER_PROMPT,
+    EVALUATOR_SYSTEM_PROMPT,
+    ORCHESTRATOR_SYSTEM_PROMPT,
+    SEARCH_WORKER_PROMPT,
+)
+from agent.prompts.frontline import FRONTLINE_SYSTEM_PROMPT
+from agent.prompts.workers.general import GENERAL_WORKER_PROMPT
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateError(ValueError):
+    """Raised when templates or prompts don't match what the code parses."""
+
+
+def _version(*parts: str) -> str:
+    return hashlib.sha256("\x00".join(parts).encode()).hexdigest()[:12]
+
+
+class Template:
+    """Static instruction plus named slots, in most-to-least-stable order."""
+
+    __slots__ = ("name", "instruction", "slots", "version", "_headers")
+
+    def __init__(self, name: str, instruction: str, slots: Sequence[tuple[str, str]]) -> None:
+        """Build a template from ``(slot, title)`` pairs."""
+        self.name = name
+        self.instruction = instruction
+        self.slots = tuple(slot for slot, _ in slots)
+        self._headers = tuple((slot, f"{title}:\n") for slot, title in slots)
+        self.version = _version(instruction, *(title for _, title in slots))
+
+    def render(self, **values: str) -> str:
+        """Fill the slots; empty or missing slots are left out.
+
+        Raises:
+            KeyError: On a slot name the template doesn't have
+        """
+        parts = [self.instruction]
+        for slot, header in self._headers:
+            body = values.pop(slot, None)
+            if body:
+                parts.append(header + body)
+        if values:
+            raise KeyError(f"{self.name} has no slot(s) {sorted(values)}")
+        return "\n\n".join(parts)
+
+
+FRONTLINE = Template(
+    "frontline",
+    FRONTLINE_INSTRUCTION,
+    [("history", "Recent conversation"), ("message", "Current user message")],
+)
+ORCHESTRATOR = Template(
+    "orchestrator",
+    ORCHESTRATOR_INSTRUCTION,
+    [("history", "Conversation History"), ("request", "Current User Request")],
+)
+EVALUATOR = Template(
+    "evaluator",
+    EVALUATOR_INSTRUCTION,
+    [
+        ("task", "Task Description"),
+        ("criteria", "Success Criteria"),
+        ("output", "Worker Output"),
+        ("previous_feedback", "Previous feedback"),
+        ("changes", "Changes since the previous attempt"),
+    ],
+)
+SEARCH_WORKER = Template(
+    "search_worker",
+    SEARCH_WORKER_INSTRUCTION,
+    [
+        ("task", "Task"),
+        ("results", "Search Results"),
+        ("draft", "Previous draft"),
+        ("feedback", "Previous feedback to address"),
+    ],
+)
+EMAIL_WORKER = Template(
+    "email_worker",
+    EMAIL_WORKER_INSTRUCTION,
+    [
+        ("task", "Task"),
+        ("parameters", "Parameters provided"),
+        ("draft", "Current draft"),
+        ("revise", "Fields to revise"),
+        ("feedback", "Previous feedback to address"),
+    ],
+)
+GENERAL_WORKER = Template(
+    "general_worker",
+    GENERAL_WORKER_INSTRUCTION,
+    [("task", "Task"), ("draft", "Previous draft"), ("feedback", "Previous feedback to address")],
+)
+
+TEMPLATES = (FRONTLINE, ORCHESTRATOR, EVALUATOR, SEARCH_WORKER, EMAIL_WORKER, GENERAL_WORKER)
+
+SYSTEM_PROMPTS = {
+    "frontline": FRONTLINE_SYSTEM_PROMPT,
+    "orchestrator": ORCHESTRATOR_SYSTEM_PROMPT,
+    "evaluator": EVALUATOR_SYSTEM_PROMPT,
+    "search_worker": SEARCH_WORKER_PROMPT,
+    "email_worker": EMAIL_WORKER_PROMPT,
+    "general_worker": GENERAL_WORKER_PROMPT,
+}
+
+# Structured outputs each agent's prompt text must describe
+SCHEMAS: tuple[tuple[str, str, type[BaseModel]], ...] = (
+    ("orchestrator", ORCHESTRATOR_SYSTEM_PROMPT, OrchestratorDecision),
+    ("evaluator", EVALUATOR_SYSTEM_PROMPT, EvaluatorResult),
+    ("email_worker", EMAIL_WORKER_INSTRUCTION, EmailParams),
+)
+
+_json_block = re.compile(r"\{[^{}]*\}")
+
+
+def missing_fields(text: str, model: type[BaseModel]) -> list[str]:
+    """Return the model's fields that ``text`` never mentions as a whole word or JSON key."""
+    return [name for name in model.model_fields if not re.search(rf"\b{re.escape(name)}\b", text)]
+
+
+def _frontline_problems(prompt: str) -> list[str]:
+    examples = _json_block.findall(prompt)
+    if not examples:
+        return ["frontline: no JSON response examples"]
+    problems: list[str] = []
+    for example in examples:
+        try:
+            data = json.loads(example)
+        except json.JSONDecodeError as e:
+            problems.append(f"frontline: example is not valid JSON ({e})")
+            continue
+        if "route_to_orchestrator" not in data:
+            problems.append("frontline: example lacks route_to_orchestrator")
+    return problems
+
+
+def validate() -> None:
+    """Check templates and prompts against the outputs the code parses.
+
+    Raises:
+        TemplateError: Listing every problem found
+    """
+    problems: list[str] = []
+    for name, text, model in SCHEMAS:
+        problems.extend(f"{name}: prompt never mentions {field}" for field in missing_fields(text, model))
+    problems.extend(
+        f"orchestrator: prompt never mentions worker type {t.value}"
+        for t in WorkerType
+        if t.value not in ORCHESTRATOR_SYSTEM_PROMPT
+    )
+    problems.extend(_frontline_problems(FRONTLINE_SYSTEM_PROMPT))
+    for template in TEMPLATES:
+        if len(set(template.slots)) != len(template.slots):
+            problems.append(f"{template.name}: duplicate slot names")
+    if problems:
+        raise TemplateError("; ".join(problems))
+
+
+def versions() -> dict[str, str]:
+    """Return ``{agent: "<template hash>/<system prompt hash>"}``."""
+    return {t.name: f"{t.version}/{_version(SYSTEM_PROMPTS[t.name])}" for t in TEMPLATES}
+
+
+def check_and_log() -> None:
+    """Validate (raising on problems) and log each agent's prompt versions."""
+    validate()
+    for name, version in versions().items():
+        logger.info(f"🧾 PROMPTS: {name} {version}")
@@ -1,23 +1,124 @@
+"""Lazy worker registry.
+
+Workers are registered as ``"module:attribute"`` targets and only imported
+on first use, so importing this package does not pull in worker SDKs such as
+``sendgrid`` or ``serpapi``. Additional workers (or replacements for the
+built-in ones) can be registered by installed packages through the
+``agent.workers`` entry-point group, keyed by worker type name.
+
+Workers may accept a ``state`` keyword: the ``WorkerResult.state`` of their
+previous attempt, so a retry can reuse fetched data and revise its draft
+instead of starting over. Workers without it are simply called afresh.
+
+Workers with a side effect (sending an email) can also accept ``commit``:
+they then return a draft marked ``deferred`` on each attempt, and are called
+once more with ``commit=True`` and the passing attempt's ``state`` after the
+evaluator accepts it, so the side effect happens exactly once.
+"""
+
+import asyncio
+import importlib
+import inspect
+import logging
+from collections.abc import Awaitable, Callable
+from importlib.metadata import entry_points
 from typing import Any
 
 from agent.models import WorkerResult, WorkerType
-from agent.workers import email_worker, general_worker, search_worker
 
-_workers = {
-    WorkerType.SEARCH: search_worker.execute,
-    WorkerType.EMAIL: email_worker.execute,
-    WorkerType.GENERAL: general_worker.execute,
+logger = logging.getLogger(__name__)
+
+ENTRY_POINT_GROUP = "agent.workers"
+
+WorkerFn = Callable[..., Awaitable[WorkerResult]]
+
+_workers: dict[str, str | WorkerFn] = {
+    WorkerType.SEARCH.value: "agent.workers.search_worker:execute",
+    WorkerType.EMAIL.value: "agent.workers.email_worker:execute",
+    WorkerType.GENERAL.value: "agent.workers.general_worker:execute",
 }
+_loaded: dict[str, WorkerFn] = {}
+_discovered = False
+
+
+def register_worker(worker_type: WorkerType | str, target: str | WorkerFn) -> None:
+    """Register a worker by import target (``"module:attr"``) or callable."""
+    name = _name(worker_type)
+    _workers[name] = target
+    _loaded.pop(name, None)
+
+
+def _name(worker_type: WorkerType | str) -> str:
+    return worker_type.value if isinstance(worker_type, WorkerType) else worker_type
+
+
+def _discover() -> None:
+    """Register workers advertised through entry points (once)."""
+    global _discovered
+    if _discovered:
+        return
+    _discovered = True
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        logger.info(f"🧩 WORKERS: Registered {ep.name} from entry point {ep.value}")
+        register_worker(ep.name, ep.value)
+
+
+def load_worker(worker_type: WorkerType | str) -> WorkerFn | None:
+    """Import (on first use) and return the worker function for a type."""
+    name = _name(worker_type)
+    worker_fn = _loaded.get(name)
+    if worker_fn:
+        return worker_fn
+
+    _discover()
+    target = _workers.get(name)
+    if target is None:
+        return None
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        target = getattr(importlib.import_module(module_name), attr)
+
+    _loaded[name] = target
+    return target
+
+
+async def preload_workers() -> None:
+    """Import every registered worker off the event loop.
+
+    Intended to run as a background task after startup so the first routed
+    request does not pay for worker imports.
+    """
+    _discover()
+    for name in list(_workers):
+        try:
+            await asyncio.to_thread(load_worker, name)
+        except Exception as e:
+            logger.warning(f"⚠️  WORKERS: Failed to preload {name}: {e}")
+    logger.info(f"🧩 WORKERS: Preloaded {len(_loaded)}/{len(_workers)} workers")
+
+
+def _accepts(worker_fn: WorkerFn, keyword: str) -> bool:
+    try:
+        return keyword in inspect.signature(worker_fn).parameters
+    except (TypeError, ValueError):
+        return False
 
 
 async def execute_worker(
-    worker_type: WorkerType,
+    worker_type: WorkerType | str,
     task_description: str,
     parameters: dict[str, Any],
     feedback: str | None = None,
+    failures: int = 0,
+    state: dict[str, Any] | None = None,
+    commit: bool = False,
 ) -> WorkerResult:
-    """Execute the appropriate worker based on type."""
-    worker_fn = _workers.get(worker_type)
+    """Execute the appropriate worker based on type.
+
+    ``state`` (a previous attempt's ``WorkerResult.state``) and ``commit`` are
+    only passed to workers that accept them.
+    """
+    worker_fn = load_worker(worker_type)
     if not worker_fn:
         return WorkerResult(
             success=False,
@@ -25,7 +126,18 @@ async def execute_worker(
             error=f"Worker {worker_type} not available",
         )
 
-    return await worker_fn(task_description, parameters, feedback)
+    kwargs: dict[str, Any] = {}
+    if state and _accepts(worker_fn, "state"):
+        kwargs["state"] = state
+    if commit and _accepts(worker_fn, "commit"):
+        kwargs["commit"] = True
+    return await worker_fn(task_description, parameters, feedback, failures, **kwargs)
 
 
-__all__ = ["execute_worker", "WorkerType"]
+__all__ = [
+    "execute_worker",
+    "load_worker",
+    "preload_workers",
+    "register_worker",
+    "WorkerType",
+]
@@ -1,55 +1,97 @@
+import json
 import logging
-import os
+import re
+from functools import cache
 from typing import Any
 
 from agents import Agent, Runner
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
 
-from agent.models import EmailParams, WorkerResult
+from agent.backends import get_email_backend
+from agent.context import record_usage
+from agent.model_router import RoutingSignals, default_model, run_config
+from agent.models import EmailParams, WorkerResult, WorkerType
 from agent.prompts import EMAIL_WORKER_PROMPT
+from agent.templates import EMAIL_WORKER
 
 logger = logging.getLogger(__name__)
 
-_api_key = os.getenv("SENDGRID_API_KEY", "")
-_from_email = os.getenv("SENDGRID_FROM_EMAIL", "noreply@example.com")
+EMAIL_FIELDS = ("to", "subject", "body")
 
-_agent = Agent(
-    name="EmailWorker",
-    instructions=EMAIL_WORKER_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-)
+# Words in evaluator feedback that point at each field. The recipient is never
+# rewritten from feedback: a retry must not redirect the email.
+_FIELD_WORDS = {
+    "subject": ("subject", "title"),
+    "body": ("body", "content", "tone", "message", "length", "detail"),
+}
+
+
+@cache
+def _get_agent() -> Agent:
+    """Build the worker agent on first use."""
+    return Agent(
+        name="EmailWorker",
+        instructions=EMAIL_WORKER_PROMPT,
+        model=default_model("email_worker"),
+    )
 
 
 def _send_email(to: str, subject: str, body: str) -> dict[str, Any]:
-    """Send email via SendGrid API."""
-    if not _api_key:
+    """Send email via the email backend."""
+    backend = get_email_backend()
+    if not backend.configured:
         return {"success": False, "error": "SENDGRID_API_KEY not configured"}
 
-    message = Mail(
-        from_email=_from_email,
-        to_emails=to,
-        subject=subject,
-        plain_text_content=body,
-    )
-
     try:
-        sg = SendGridAPIClient(_api_key)
-        response = sg.send(message)
+        status_code = backend.send(to, subject, body)
         return {
             "success": True,
-            "status_code": response.status_code,
+            "status_code": status_code,
         }
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def _failed_fields(feedback: str | None) -> set[str]:
+    """Guess which fields the feedback is about (subject and body if unclear)."""
+    lowered = (feedback or "").lower()
+    fields = {f for f, words in _FIELD_WORDS.items() if any(w in lowered for w in words)}
+    return fields or {"subject", "body"}
+
+
+def _parse_email(text: str) -> dict[str, str]:
+    """Read the composed fields from the agent's JSON (plain text becomes the body)."""
+    match = re.search(r"\{.*\}", text, re.S)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            return {f: str(data[f]) for f in EMAIL_FIELDS if data.get(f)}
+        except (ValueError, AttributeError):
+            pass
+    return {"body": text}
+
+
 async def execute(
     task_description: str,
     parameters: dict[str, Any],
     feedback: str | None = None,
+    failures: int = 0,
+    state: dict[str, Any] | None = None,
+    commit: bool = False,
 ) -> WorkerResult:
-    """Execute email sending task."""
+    """Draft the email, or send the accepted draft.
+
+    Each attempt returns a ``deferred`` draft without sending anything. On a
+    retry, ``state["email"]`` holds the previous draft and only the fields the
+    feedback points at are recomposed; fields pinned by ``parameters`` always
+    win. With ``commit``, the draft in ``state`` is sent (once, after the
+    evaluator passed it).
+    """
+    draft = state.get("email") if state else None
+    if commit:
+        if not draft:
+            return WorkerResult(success=False, output="", error="No email draft to send")
+        return _send(EmailParams(**draft))
+
     logger.info("📧 EMAIL_WORKER: Starting execution")
     logger.info(f"   Task: {task_description[:80]}...")
     logger.info(f"   To: {parameters.get('to', 'Not specified')}")
@@ -57,50 +99,24 @@ async def execute(
         logger.info("   With feedback from previous attempt")
 
     try:
-        feedback_section = f"Previous feedback to address: {feedback}" if feedback else ""
-        context = f"""Task: {task_description}
+        pinned = {f for f in EMAIL_FIELDS if parameters.get(f)}
+        revise = _failed_fields(feedback) - pinned if draft else set(EMAIL_FIELDS)
+        if draft:
+            logger.info(f"   Revising: {', '.join(sorted(revise)) or 'nothing (all pinned)'}")
 
-Parameters provided:
-- To: {parameters.get('to', 'Not specified')}
-- Subject: {parameters.get('subject', 'Not specified')}
-- Body: {parameters.get('body', 'Not specified')}
-
-{feedback_section}
-
-Compose the email and confirm it's ready to send. Return a JSON with to, subject, and body fields."""
-
-        result = await Runner.run(
-            _agent,
-            input=context,
-        )
-
-        email_content = result.final_output
-
-        email_params = EmailParams(
-            to=parameters.get("to", ""),
-            subject=parameters.get("subject", ""),
-            body=parameters.get("body", email_content),
-        )
-
-        logger.info(f"📧 EMAIL_WORKER: Sending to {email_params.to}")
-        send_result = _send_email(
-            email_params.to,
-            email_params.subject,
-            email_params.body,
-        )
+        composed = await _compose(task_description, parameters, feedback, failures, draft, revise) if revise else {}
 
-        if not send_result["success"]:
-            logger.error(f"❌ EMAIL_WORKER: Send failed: {send_result['error']}")
-            return WorkerResult(
-                success=False,
-                output="",
-                error=send_result["error"],
-            )
+        fields = {f: "" for f in EMAIL_FIELDS}
+        fields.update(draft or {})
+        fields.update({f: composed[f] for f in revise if composed.get(f)})
+        fields.update({f: str(parameters[f]) for f in pinned})
+        email_params = EmailParams(**fields)
 
-        logger.info(f"✓ EMAIL_WORKER: Sent successfully (status: {send_result['status_code']})")
         return WorkerResult(
             success=True,
-            output=f"Email sent successfully to {email_params.to}\nSubject: {email_params.subject}\nStatus: {send_result['status_code']}",
+            output=f"Email draft to {email_params.to}\nSubject: {email_params.subject}\n\n{email_params.body}",
+            state={"email": email_params.model_dump()},
+            deferred=True,
         )
 
     except Exception as e:
@@ -110,3 +126,64 @@ Compose the email and confirm it's ready to send. Return a JSON with to, subject
             output="",
             error=str(e),
         )
+
+
+def _send(email_params: EmailParams) -> WorkerResult:
+    """Send an accepted draft."""
+    logger.info(f"📧 EMAIL_WORKER: Sending to {email_params.to}")
+    send_result = _send_email(
+        email_params.to,
+        email_params.subject,
+        email_params.body,
+    )
+
+    if not send_result["success"]:
+        logger.error(f"❌ EMAIL_WORKER: Send failed: {send_result['error']}")
+        return WorkerResult(
+            success=False,
+            output="",
+            error=send_result["error"],
+        )
+
+    logger.info(f"✓ EMAIL_WORKER: Sent successfully (status: {send_result['status_code']})")
+    return WorkerResult(
+        success=True,
+        output=f"Email sent successfully to {email_params.to}\nSubject: {email_params.subject}\nStatus: {send_result['status_code']}",
+        state={"email": email_params.model_dump()},
+    )
+
+
+async def _compose(
+    task_description: str,
+    parameters: dict[str, Any],
+    feedback: str | None,
+    failures: int,
+    draft: dict[str, str] | None,
+    revise: set[str],
+) -> dict[str, str]:
+    """Have the agent compose the email, or rewrite the listed fields of a draft."""
+    provided = (
+        f"- To: {parameters.get('to', 'Not specified')}\n"
+        f"- Subject: {parameters.get('subject', 'Not specified')}\n"
+        f"- Body: {parameters.get('body', 'Not specified')}"
+    )
+    context = EMAIL_WORKER.render(
+        task=task_description,
+        parameters=provided,
+        draft=json.dumps(draft) if draft else "",
+        revise=", ".join(sorted(revise)) if draft else "",
+        feedback=feedback or "",
+    )
+
+    signals = RoutingSignals(
+        input_chars=len(context),
+        worker_type=WorkerType.EMAIL,
+        evaluator_failures=failures,
+    )
+    result = await Runner.run(
+        _get_agent(),
+        input=context,
+        run_config=run_config("email_worker", signals),
+    )
+    record_usage("email_worker", result)
+    return _parse_email(result.final_output)
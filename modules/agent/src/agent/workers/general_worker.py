@@ -1,46 +1,65 @@
 import logging
-import os
+from functools import cache
 from typing import Any
 
 from agents import Agent, Runner
 
-from agent.models import WorkerResult
+from agent.context import record_usage
+from agent.model_router import RoutingSignals, default_model, run_config
+from agent.models import WorkerResult, WorkerType
 from agent.prompts.workers.general import GENERAL_WORKER_PROMPT
+from agent.templates import GENERAL_WORKER
 
 logger = logging.getLogger(__name__)
 
-_agent = Agent(
-    name="GeneralWorker",
-    instructions=GENERAL_WORKER_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-)
+
+@cache
+def _get_agent() -> Agent:
+    """Build the worker agent on first use."""
+    return Agent(
+        name="GeneralWorker",
+        instructions=GENERAL_WORKER_PROMPT,
+        model=default_model("general_worker"),
+    )
 
 
 async def execute(
     task_description: str,
     parameters: dict[str, Any],
     feedback: str | None = None,
+    failures: int = 0,
+    state: dict[str, Any] | None = None,
 ) -> WorkerResult:
-    """Execute general conversational task."""
+    """Execute general conversational task (revising ``state["draft"]`` on a retry)."""
     logger.info("💬 GENERAL_WORKER: Starting execution")
     logger.info(f"   Task: {task_description[:80]}...")
     if feedback:
         logger.info("   With feedback from previous attempt")
 
     try:
-        context = task_description
-        if feedback:
-            context = f"{task_description}\n\nPrevious feedback to address: {feedback}"
+        context = GENERAL_WORKER.render(
+            task=task_description,
+            draft=state.get("draft", "") if state else "",
+            feedback=feedback or "",
+        )
 
+        signals = RoutingSignals(
+            input_chars=len(context),
+            worker_type=WorkerType.GENERAL,
+            evaluator_failures=failures,
+        )
         result = await Runner.run(
-            _agent,
+            _get_agent(),
             input=context,
+            run_config=run_config("general_worker", signals),
         )
+        record_usage("general_worker", result)
 
         logger.info("✓ GENERAL_WORKER: Execution complete")
         return WorkerResult(
             success=True,
             output=result.final_output,
+            state={"draft": result.final_output},
         )
 
     except Exception as e:
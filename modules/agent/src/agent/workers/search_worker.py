@@ -1,105 +1,90 @@
 import logging
-import os
+from functools import cache
 from typing import Any
 
 from agents import Agent, Runner
-from serpapi import GoogleSearch
 
-from agent.models import WorkerResult
+from agent.backends import get_search_backend
+from agent.context import record_usage
+from agent.model_router import RoutingSignals, default_model, run_config
+from agent.models import WorkerResult, WorkerType
 from agent.prompts import SEARCH_WORKER_PROMPT
+from agent.retrieval import gather_results
+from agent.templates import SEARCH_WORKER
 
 logger = logging.getLogger(__name__)
 
-_api_key = os.getenv("SERPAPI_KEY", "")
 
-_agent = Agent(
-    name="SearchWorker",
-    instructions=SEARCH_WORKER_PROMPT,
-    model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-)
-
-
-def _search(query: str, num_results: int = 5) -> list[dict[str, str]]:
-    """Execute search query via SerpAPI."""
-    if not _api_key:
-        return [{"error": "SERPAPI_KEY not configured"}]
-
-    params = {
-        "q": query,
-        "api_key": _api_key,
-        "num": num_results,
-    }
-
-    search = GoogleSearch(params)
-    results = search.get_dict()
-
-    organic_results = results.get("organic_results", [])
-    return [
-        {
-            "title": r.get("title", ""),
-            "link": r.get("link", ""),
-            "snippet": r.get("snippet", ""),
-        }
-        for r in organic_results[:num_results]
-    ]
-
-
-def _format_results(results: list[dict[str, str]]) -> str:
-    """Format search results for agent context."""
-    formatted = [
-        f"{i}. {r['title']}\n   {r['link']}\n   {r['snippet']}"
-        for i, r in enumerate(results, 1)
-    ]
-    return "\n\n".join(formatted)
+@cache
+def _get_agent() -> Agent:
+    """Build the worker agent on first use."""
+    return Agent(
+        name="SearchWorker",
+        instructions=SEARCH_WORKER_PROMPT,
+        model=default_model("search_worker"),
+    )
 
 
 async def execute(
     task_description: str,
     parameters: dict[str, Any],
     feedback: str | None = None,
+    failures: int = 0,
+    state: dict[str, Any] | None = None,
 ) -> WorkerResult:
-    """Execute web search task."""
+    """Execute web search task.
+
+    On a retry, ``state`` carries the fetched results and the previous draft:
+    only query variants not yet run are searched, and the draft is revised.
+    """
     logger.info("🔎 SEARCH_WORKER: Starting execution")
     logger.info(f"   Task: {task_description[:80]}...")
     if feedback:
         logger.info("   With feedback from previous attempt")
 
     try:
-        query = parameters.get("query", task_description)
-        num_results = parameters.get("num_results", 5)
-
-        logger.info(f"🔎 SEARCH_WORKER: Searching for '{query}' ({num_results} results)")
-        search_results = _search(query, num_results)
-
-        if search_results and "error" in search_results[0]:
-            logger.error(f"❌ SEARCH_WORKER: Search API error: {search_results[0]['error']}")
+        if not get_search_backend().configured:
+            logger.error("❌ SEARCH_WORKER: Search API error: SERPAPI_KEY not configured")
             return WorkerResult(
                 success=False,
                 output="",
-                error=search_results[0]["error"],
+                error="SERPAPI_KEY not configured",
             )
 
-        logger.info(f"✓ SEARCH_WORKER: Got {len(search_results)} results")
-
-        feedback_section = f"Previous feedback to address: {feedback}" if feedback else ""
-        context = f"""Task: {task_description}
+        query = parameters.get("query")
+        num_results = parameters.get("num_results", 5)
 
-Search Results:
-{_format_results(search_results)}
+        logger.info(f"🔎 SEARCH_WORKER: Searching for '{query or task_description}' ({num_results} results per query)")
+        search_context, retrieval = await gather_results(
+            task_description, query, feedback, num_results, prior=state.get("retrieval") if state else None
+        )
 
-{feedback_section}
+        logger.info(f"✓ SEARCH_WORKER: Got {len(retrieval['results'])} unique results")
 
-Synthesize these results into a clear, informative response."""
+        context = SEARCH_WORKER.render(
+            task=task_description,
+            results=search_context,
+            draft=state.get("draft", "") if state else "",
+            feedback=feedback or "",
+        )
 
+        signals = RoutingSignals(
+            input_chars=len(context),
+            worker_type=WorkerType.SEARCH,
+            evaluator_failures=failures,
+        )
         result = await Runner.run(
-            _agent,
+            _get_agent(),
             input=context,
+            run_config=run_config("search_worker", signals),
         )
+        record_usage("search_worker", result)
 
         logger.info("✓ SEARCH_WORKER: Execution complete")
         return WorkerResult(
             success=True,
             output=result.final_output,
+            state={"retrieval": retrieval, "draft": result.final_output},
         )
 
     except Exception as e:
@@ -1,6 +1,17 @@
 #!/usr/bin/env bash
 set -euo pipefail
 
+# AGENT_WORKERS>1: one uvicorn process per worker, sharing conversations
+# through AGENT_STORE_URL (defaults to a local SQLite file). No hot-reload.
+if [[ "${AGENT_WORKERS:-1}" -gt 1 ]]; then
+  export AGENT_STORE_URL="${AGENT_STORE_URL:-sqlite:///agent-state.db}"
+  exec uv run python -m uvicorn agent.server:app \
+    --host 0.0.0.0 \
+    --port 8000 \
+    --workers "${AGENT_WORKERS}" \
+    --log-level warning
+fi
+
 # Start FastAPI websocket server with hot-reload
 exec uv run python -m uvicorn agent.server:app \
   --host 0.0.0.0 \
@@ -0,0 +1,6 @@
+"""Performance benchmarks; run with `make benchmarks`.
+
+Each benchmark checks its results against `baseline.json` and fails past
+AGENT_BENCH_TOLERANCE. After an intended performance change, refresh the
+baseline with `make benchmarks_baseline`.
+"""
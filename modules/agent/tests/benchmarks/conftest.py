@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+logger = logging.getLogger("benchmarks")
+
+BASELINE_PATH = Path(__file__).with_name("baseline.json")
+# Allowed slowdown over the stored baseline, as a fraction (1.0 = twice as slow)
+TOLERANCE = float(os.getenv("AGENT_BENCH_TOLERANCE", "1.0"))
+# AGENT_BENCH_UPDATE=1 rewrites the baseline from this run instead of checking it
+UPDATE = os.getenv("AGENT_BENCH_UPDATE") == "1"
+
+
+def _calibrate() -> float:
+    """Time a fixed pure-Python workload (best of 5), in milliseconds."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        sum(i * i for i in range(200_000))
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+class Baseline:
+    """Stored benchmark results that new runs are compared against.
+
+    Wall-clock metrics are stored in units of a calibration workload timed in
+    the same session. That keeps the baseline usable across machines of
+    different speed and on a loaded CI runner.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.values: dict[str, float] = json.loads(path.read_text()) if path.exists() else {}
+        self.updated = False
+        self.unit_ms = _calibrate()
+
+    def check_ms(self, name: str, ms: float) -> None:
+        """Check a wall-clock duration, normalised by the calibration workload."""
+        logger.info(f"{name}: {ms:.1f}ms")
+        self.check(name.removesuffix("_ms"), ms / self.unit_ms)
+
+    def check(self, name: str, value: float, higher_is_better: bool = False) -> None:
+        """Log ``value`` and fail if it regressed past the tolerance."""
+        expected = self.values.get(name)
+        logger.info(f"{name}: {value:.3f} (baseline {expected})")
+        if UPDATE:
+            self.values[name] = round(value, 3)
+            self.updated = True
+            return
+        if expected is None:
+            pytest.fail(f"No baseline for {name}; run `make benchmarks_baseline`")
+        if higher_is_better:
+            limit = expected * (1 - TOLERANCE)
+            assert value >= limit, f"{name} regressed: {value:.3f} < {limit:.3f} (baseline {expected})"
+        else:
+            limit = expected * (1 + TOLERANCE)
+            assert value <= limit, f"{name} regressed: {value:.3f} > {limit:.3f} (baseline {expected})"
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    stored = Baseline(BASELINE_PATH)
+    yield stored
+    if stored.updated:
+        BASELINE_PATH.write_text(json.dumps(dict(sorted(stored.values.items())), indent=2) + "\n")
@@ -0,0 +1,62 @@
+import logging
+import time
+
+from agent import templates
+from agent.context import (
+    EMAIL_WORKER_INSTRUCTION,
+    EVALUATOR_INSTRUCTION,
+    FRONTLINE_INSTRUCTION,
+    GENERAL_WORKER_INSTRUCTION,
+    ORCHESTRATOR_INSTRUCTION,
+    SEARCH_WORKER_INSTRUCTION,
+)
+
+logger = logging.getLogger(__name__)
+
+CALLS = 20_000
+HISTORY = "USER: lorem ipsum dolor sit amet\nASSISTANT: consectetur adipiscing elit\n" * 3
+TASK = "Summarise the latest results on the topic " * 5
+RESULTS = "Title: Result\nURL: https://example.com\nSnippet: lorem ipsum dolor sit amet\n\n" * 5
+
+# (template, instruction, [(title, slot, body)]) per pipeline stage
+STAGES = [
+    (templates.FRONTLINE, FRONTLINE_INSTRUCTION,
+     [("Recent conversation", "history", HISTORY), ("Current user message", "message", TASK)]),
+    (templates.ORCHESTRATOR, ORCHESTRATOR_INSTRUCTION,
+     [("Conversation History", "history", HISTORY), ("Current User Request", "request", TASK)]),
+    (templates.EVALUATOR, EVALUATOR_INSTRUCTION,
+     [("Task Description", "task", TASK), ("Success Criteria", "criteria", TASK),
+      ("Worker Output", "output", RESULTS), ("Previous feedback", "previous_feedback", ""),
+      ("Changes since the previous attempt", "changes", "")]),
+    (templates.SEARCH_WORKER, SEARCH_WORKER_INSTRUCTION,
+     [("Task", "task", TASK), ("Search Results", "results", RESULTS), ("Previous draft", "draft", ""),
+      ("Previous feedback to address", "feedback", "")]),
+    (templates.EMAIL_WORKER, EMAIL_WORKER_INSTRUCTION,
+     [("Task", "task", TASK), ("Parameters provided", "parameters", "to: a@example.com"),
+      ("Current draft", "draft", ""), ("Fields to revise", "revise", ""),
+      ("Previous feedback to address", "feedback", "")]),
+    (templates.GENERAL_WORKER, GENERAL_WORKER_INSTRUCTION,
+     [("Task", "task", TASK), ("Previous draft", "draft", ""), ("Previous feedback to address", "feedback", "")]),
+]
+
+
+def _time(build) -> tuple[float, str]:
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        text = build()
+    return (time.perf_counter() - start) / CALLS, text
+
+
+def test_context_build_cost_per_stage(baseline) -> None:
+    lines = []
+    total = 0.0
+    for template, instruction, sections in STAGES:
+        values = {slot: body for _, slot, body in sections}
+        expected = "\n\n".join([instruction, *(f"{title}:\n{body}" for title, _, body in sections if body)])
+        rendered, text = _time(lambda: template.render(**values))
+
+        assert text == expected
+        total += rendered
+        lines.append(f"{template.name}: {rendered * 1e6:.2f}us")
+    logger.info(f"Context build per call ({CALLS} calls):\n" + "\n".join(lines))
+    baseline.check_ms("context_build.render_ms", total * CALLS * 1e3)
@@ -0,0 +1,46 @@
+import logging
+import time
+
+from agent.conversation import Conversation
+
+TURNS = 2_000
+MESSAGE = "lorem ipsum dolor sit amet " * 400
+
+logger = logging.getLogger(__name__)
+
+
+def _naive_window(history: list[dict[str, str]], size: int) -> str:
+    return "\n".join([f"{m['role'].upper()}: {m['content']}" for m in history[-size:]])
+
+
+def _run_naive() -> tuple[float, str, str]:
+    history: list[dict[str, str]] = []
+    start = time.perf_counter()
+    for i in range(TURNS):
+        history.append({"role": "user", "content": f"{i} {MESSAGE}"})
+        frontline = _naive_window(history, 4)
+        orchestrator = _naive_window(history, 6)
+        history.append({"role": "assistant", "content": f"{i} {MESSAGE}"})
+    return time.perf_counter() - start, frontline, orchestrator
+
+
+def _run_incremental() -> tuple[float, str, str]:
+    conversation = Conversation()
+    start = time.perf_counter()
+    for i in range(TURNS):
+        conversation.append("user", f"{i} {MESSAGE}")
+        frontline = conversation.window(4)
+        orchestrator = conversation.window(6)
+        conversation.append("assistant", f"{i} {MESSAGE}")
+    return time.perf_counter() - start, frontline, orchestrator
+
+
+def test_long_conversation_windows(baseline) -> None:
+    # Each run's history is released before the next one starts
+    naive, naive_frontline, naive_orchestrator = _run_naive()
+    incremental, frontline, orchestrator = _run_incremental()
+
+    assert frontline == naive_frontline
+    assert orchestrator == naive_orchestrator
+    logger.info(f"{TURNS} turns: naive {naive * 1e3:.1f}ms, incremental {incremental * 1e3:.1f}ms")
+    baseline.check("conversation.window_speedup", naive / incremental, higher_is_better=True)
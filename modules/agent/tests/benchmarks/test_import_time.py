@@ -0,0 +1,28 @@
+import re
+import subprocess
+import sys
+
+HEAVY_MODULES = ("sendgrid", "serpapi")
+
+
+def _import(module: str) -> subprocess.CompletedProcess[str]:
+    code = f"import sys, {module}; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_server_import_skips_worker_sdks(baseline) -> None:
+    proc = _import("agent.server")
+    assert proc.stdout.strip() == ""
+
+    # -X importtime lines: "import time: self [us] | cumulative | module"
+    cumulative = {
+        line.rsplit("|", 1)[1].strip(): int(line.split("|")[1])
+        for line in proc.stderr.splitlines()
+        if re.match(r"import time:\s+\d", line)
+    }
+    baseline.check_ms("import.agent_server_ms", cumulative["agent.server"] / 1e3)
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import logging
+import time
+
+import pytest
+
+from agent.fakes import FakeSettings, FakeSocket, LatencyProfile
+from agent.metrics import StageTimings, collect, percentiles
+from agent.runner import handle_chat
+
+pytestmark = pytest.mark.anyio
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = 200
+CONCURRENCY = 50
+
+MODEL_LATENCY = LatencyProfile(median=0.004, sigma=0.5)
+SCENARIOS = {
+    "direct": ("hello, how are you?", 0),
+    "routed": ("search for the latest AI news", 0),
+    "retry-heavy": ("research the history of chess", 2),
+}
+
+
+async def _request(message: str, uuid: str) -> tuple[float, StageTimings, FakeSocket]:
+    socket = FakeSocket()
+    start = time.perf_counter()
+    with collect() as timings:
+        await handle_chat(socket, message, uuid)
+    return time.perf_counter() - start, timings, socket
+
+
+async def _scenario(message: str) -> tuple[list[float], StageTimings]:
+    limit = asyncio.Semaphore(CONCURRENCY)
+
+    async def bounded(i: int) -> tuple[float, StageTimings, FakeSocket]:
+        async with limit:
+            # Unique text per request keeps the fake evaluator's per-task counts apart
+            return await _request(f"{message} ({i})", f"bench-{i}")
+
+    results = await asyncio.gather(*(bounded(i) for i in range(REQUESTS)))
+
+    stages = StageTimings()
+    for _, timings, socket in results:
+        stages.merge(timings)
+        assert json.loads(socket.frames[-1]) == {"on_chat_model_end": True}
+    return [elapsed for elapsed, _, _ in results], stages
+
+
+def _row(label: str, samples: list[float]) -> str:
+    p = percentiles(samples)
+    return f"  {label:<12}{len(samples):>6}{p['p50'] * 1e3:>10.1f}{p['p95'] * 1e3:>10.1f}{p['p99'] * 1e3:>10.1f}"
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+async def test_pipeline_latency(offline, baseline, scenario: str) -> None:
+    message, evaluator_failures = SCENARIOS[scenario]
+    provider = offline(
+        FakeSettings(
+            latency=MODEL_LATENCY,
+            search_latency=LatencyProfile(median=0.002, sigma=0.3),
+            evaluator_failures=evaluator_failures,
+        )
+    )
+
+    end_to_end, stages = await _scenario(message)
+
+    rows = [_row(name, samples) for name, samples in stages.durations.items()]
+    rows.append(_row("end-to-end", end_to_end))
+    logger.info(
+        f"{scenario} ({REQUESTS} requests, concurrency {CONCURRENCY}), ms:\n"
+        f"  {'stage':<12}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}\n" + "\n".join(rows)
+    )
+    p = percentiles(end_to_end)
+    baseline.check_ms(f"pipeline.{scenario}.p50_ms", p["p50"] * 1e3)
+    baseline.check_ms(f"pipeline.{scenario}.p95_ms", p["p95"] * 1e3)
+
+    if scenario == "retry-heavy":
+        assert provider.calls["evaluator"] == REQUESTS * (evaluator_failures + 1)
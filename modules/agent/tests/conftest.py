@@ -1,6 +1,28 @@
 import pytest
 
+from agent import runner
+from agent.fakes import FakeSettings, FakeSocket, install_fakes, uninstall_fakes
+
 
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    """Install the fake provider and backends; yields a factory taking FakeSettings."""
+    monkeypatch.setattr(runner, "OFFLINE", True)
+    monkeypatch.setattr(runner, "_conversations", {})
+
+    def _install(settings: FakeSettings | None = None):
+        return install_fakes(settings)
+
+    _install()
+    yield _install
+    uninstall_fakes()
+
+
+@pytest.fixture
+def socket() -> FakeSocket:
+    return FakeSocket()
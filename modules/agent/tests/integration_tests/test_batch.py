@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import batch
+from agent.batch import BatchRequest, parse_requests, run_batch, run_file
+from agent.server import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_duplicates_share_one_run(offline) -> None:
+    provider = offline()
+    requests = [BatchRequest(id=str(i), message="search for the latest AI news") for i in range(5)]
+
+    results = [r async for r in run_batch(requests, concurrency=5)]
+
+    assert sorted(r.id for r in results) == ["0", "1", "2", "3", "4"]
+    assert all(r.routed and r.response and r.error is None for r in results)
+    assert provider.calls["frontline"] == 1
+
+
+async def test_run_file_resumes_from_output(offline, tmp_path) -> None:
+    source = tmp_path / "in.jsonl"
+    output = tmp_path / "out.jsonl"
+    source.write_text("\n".join(json.dumps({"id": f"r{i}", "message": f"hello {i}"}) for i in range(4)))
+    output.write_text(json.dumps({"id": "r0", "response": "done earlier"}) + "\n" + '{"id": "r1", "resp')
+
+    assert await run_file(source, output, concurrency=2) == 3
+
+    ids = [json.loads(line)["id"] for line in output.read_text().splitlines()[2:]]
+    assert sorted(ids) == ["r1", "r2", "r3"]
+
+
+def test_parse_requests_defaults_ids_and_rejects_bad_lines() -> None:
+    assert [r.id for r in parse_requests(['{"message": "a"}', "", '{"message": "b"}'])] == ["1", "3"]
+    assert [r.id for r in parse_requests(['{"id": 7, "message": "a"}'])] == ["7"]
+    with pytest.raises(ValueError, match="line 2"):
+        list(parse_requests(['{"message": "a"}', "not json"]))
+
+
+def test_batch_endpoint_streams_jsonl(offline) -> None:
+    body = "\n".join(json.dumps({"id": str(i), "message": f"hi {i}"}) for i in range(3))
+    with TestClient(app) as client:
+        response = client.post("/batch", content=body)
+        bad = client.post("/batch", content="{")
+        unbounded = client.post("/batch?concurrency=100000", content=body)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert sorted(json.loads(line)["id"] for line in response.text.splitlines()) == ["0", "1", "2"]
+    assert bad.status_code == 400
+    assert unbounded.status_code == 422
+
+
+async def test_run_file_stops_at_a_malformed_line(offline, tmp_path) -> None:
+    source = tmp_path / "in.jsonl"
+    output = tmp_path / "out.jsonl"
+    source.write_text(json.dumps({"id": "r0", "message": "hello"}) + "\nnot json\n")
+
+    with pytest.raises(ValueError, match="line 2"):
+        await run_file(source, output, concurrency=1)
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == ["r0"]
+
+
+async def test_closing_a_batch_cancels_its_pipelines(monkeypatch) -> None:
+    started = asyncio.Event()
+    cancelled = []
+
+    async def stuck(request):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.append(request.id)
+            raise
+
+    monkeypatch.setattr(batch, "_pipeline", stuck)
+    consumer = asyncio.create_task(anext(run_batch([BatchRequest(id="1", message="hi")], concurrency=1)))
+    await started.wait()
+
+    consumer.cancel()  # the client went away
+    await asyncio.gather(consumer, return_exceptions=True)
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+    assert cancelled == ["1"]
@@ -0,0 +1,27 @@
+import pytest
+
+from agent.loadgen import DEFAULT_SCRIPT, _wait_for_port, run_load, spawn_offline_server
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_load_against_offline_server() -> None:
+    proc, port = spawn_offline_server()
+    try:
+        await _wait_for_port(port, proc)
+        report = await run_load(
+            f"ws://127.0.0.1:{port}/ws",
+            DEFAULT_SCRIPT,
+            connections=6,
+            rate=0,
+            server_pid=proc.pid,
+        )
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    assert report.connect_errors == 0
+    assert report.error_rate == 0.0
+    assert report.turns == sum(len(turns) for turns in DEFAULT_SCRIPT) * 2
+    assert report.end_ms["p50"] >= report.first_frame_ms["p50"]
+    assert report.rss_mb["peak"] > 0
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+from agent import backends
+from agent.fakes import FakeSettings
+from agent.retrieval import expand_queries
+from agent.runner import get_conversation, handle_chat
+
+pytestmark = pytest.mark.anyio
+
+
+def _stream(socket) -> list[dict]:
+    return [json.loads(f) for f in socket.frames]
+
+
+async def test_direct_response(offline, socket) -> None:
+    await handle_chat(socket, "hello there", "u1")
+
+    frames = _stream(socket)
+    assert frames[-1] == {"on_chat_model_end": True}
+    assert "hello there" in frames[0]["on_chat_model_stream"]
+    assert [m.role for m in get_conversation("u1")] == ["user", "assistant"]
+
+
+async def test_routed_search(offline, socket) -> None:
+    await handle_chat(socket, "search for the latest AI news", "u2")
+
+    frames = _stream(socket)
+    assert frames[0] == {"on_chat_model_stream": "Processing your request..."}
+    assert frames[-1] == {"on_chat_model_end": True}
+    assert backends.get_search_backend().queries
+
+
+async def test_email_is_sent_through_fake_backend(offline, socket) -> None:
+    await handle_chat(socket, "send an email to bob@example.com saying hi", "u3")
+
+    sent = backends.get_email_backend().sent
+    assert sent[0]["to"] == "bob@example.com"
+    assert "Email sent successfully" in _stream(socket)[-2]["on_chat_model_stream"]
+
+
+async def test_evaluator_retries(offline, socket) -> None:
+    provider = offline(FakeSettings(evaluator_failures=2))
+
+    await handle_chat(socket, "research the history of chess", "u4")
+
+    assert provider.calls["search_worker"] == 3
+    assert provider.calls["evaluator"] == 3
+    assert "[Note:" not in _stream(socket)[-2]["on_chat_model_stream"]
+
+
+async def test_retries_reuse_fetched_results(offline, socket) -> None:
+    offline(FakeSettings(evaluator_failures=1))
+
+    await handle_chat(socket, "research the history of chess", "u5")
+
+    queries = backends.get_search_backend().queries
+    initial = expand_queries("Research: research the history of chess", "research the history of chess")
+    assert sorted(queries[: len(initial)]) == sorted(initial)
+    # The retry only runs variants it hasn't run yet (the feedback-driven one)
+    assert len(queries) == len(initial) + 1
+    assert any("missing" in q for q in queries[len(initial) :])
+
+
+async def test_email_is_drafted_across_retries_and_sent_once(offline, socket) -> None:
+    provider = offline(FakeSettings(evaluator_failures=1))  # feedback: "Missing detail."
+
+    await handle_chat(socket, "send an email to bob@example.com saying hi", "u6")
+
+    (sent,) = backends.get_email_backend().sent
+    assert provider.calls["evaluator"] == 2
+    # Every field was pinned by the orchestrator, so the feedback changed none of them
+    assert sent["to"] == "bob@example.com"
+    assert sent["subject"] == "Hello"
+    assert provider.calls["email_worker"] == 1
+
+
+async def test_email_is_not_sent_when_the_draft_never_passes(offline, socket) -> None:
+    offline(FakeSettings(evaluator_failures=5))
+
+    await handle_chat(socket, "send an email to bob@example.com saying hi", "u7")
+
+    assert backends.get_email_backend().sent == []
+    assert "Not sent" in _stream(socket)[-2]["on_chat_model_stream"]
@@ -0,0 +1,78 @@
+import pytest
+from openai.types.responses import ResponseCompletedEvent
+
+from agent.cassette import (
+    CassetteMiss,
+    CassetteModelProvider,
+    CassetteStore,
+    install_cassette,
+)
+from agent.fakes import FakeModelProvider, FakeSettings, FakeSocket, uninstall_fakes
+from agent.runner import handle_chat
+
+pytestmark = pytest.mark.anyio
+
+MESSAGES = ("hello there", "search for the latest AI news", "email bob@example.com hi")
+
+
+async def _run(prefix: str) -> list[list[str]]:
+    transcripts = []
+    for i, message in enumerate(MESSAGES):
+        socket = FakeSocket()
+        await handle_chat(socket, message, f"{prefix}-{i}")
+        transcripts.append(socket.frames)
+    return transcripts
+
+
+async def test_record_then_replay_offline(offline, tmp_path) -> None:
+    offline(FakeSettings(evaluator_failures=1))
+    install_cassette("record", tmp_path)
+    recorded = await _run("rec")
+
+    # Replay with nothing but the cassette: no fake provider, no fake backends
+    uninstall_fakes()
+    store = install_cassette("replay", tmp_path)
+    assert len(store) > 0
+    replayed = await _run("rep")
+
+    assert replayed == recorded
+
+
+def test_store_replays_repeats_in_order(tmp_path) -> None:
+    store = CassetteStore(tmp_path)
+    store.record("search", {"q": "x"}, {"n": 1}, 0.1)
+    store.record("search", {"q": "x"}, {"n": 2}, 0.1)
+
+    reloaded = CassetteStore(tmp_path)
+    assert [reloaded.lookup("search", {"q": "x"})["response"]["n"] for _ in range(3)] == [1, 2, 2]
+    with pytest.raises(CassetteMiss):
+        reloaded.lookup("search", {"q": "y"})
+
+
+def test_torn_last_entry_is_dropped_on_load(tmp_path) -> None:
+    store = CassetteStore(tmp_path)
+    store.record("search", {"q": "a"}, {"n": 1}, 0.1)
+    store.record("search", {"q": "b"}, {"n": 2}, 0.1)
+    file = tmp_path / "search.jsonl.gz"
+    complete = file.read_bytes()
+    file.write_bytes(complete + CassetteStore._encode({"fp": "x"})[:20])
+
+    reloaded = CassetteStore(tmp_path)
+    assert len(reloaded) == 2
+    assert file.read_bytes() == complete
+    reloaded.record("search", {"q": "c"}, {"n": 3}, 0.1)
+    assert CassetteStore(tmp_path).lookup("search", {"q": "c"})["response"] == {"n": 3}
+
+
+async def _stream(provider, input: str) -> ResponseCompletedEvent:
+    events = [e async for e in provider.get_model("m").stream_response(None, input, None, [], None, [], None)]
+    return events[-1]
+
+
+async def test_streamed_usage_is_recorded_and_replayed(tmp_path) -> None:
+    store = CassetteStore(tmp_path)
+    recorded = await _stream(CassetteModelProvider(store, FakeModelProvider()), "hello")
+    assert recorded.response.usage.input_tokens > 0
+
+    replayed = await _stream(CassetteModelProvider(CassetteStore(tmp_path)), "hello")
+    assert replayed.response.usage == recorded.response.usage
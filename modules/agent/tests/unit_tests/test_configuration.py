@@ -1,9 +1,61 @@
-from langgraph.pregel import Pregel
+import pytest
 
-from agent.graph import graph
+from agent import model_router
+from agent.model_router import ModelTier, RoutingSignals, select_model, select_tier
+from agent.models import WorkerType
 
 
-def test_placeholder() -> None:
-    # TODO: You can add actual unit tests
-    # for your graph and other logic here.
-    assert isinstance(graph, Pregel)
+@pytest.fixture(autouse=True)
+def _clear_model_env(monkeypatch):
+    monkeypatch.delenv("OPENAI_MODEL", raising=False)
+    monkeypatch.delenv("OPENAI_MODEL_FAST", raising=False)
+    monkeypatch.delenv("OPENAI_MODEL_STRONG", raising=False)
+    for name in model_router.AGENT_NAMES:
+        monkeypatch.delenv(f"OPENAI_MODEL_{name.upper()}", raising=False)
+
+
+def test_first_attempt_is_always_fast() -> None:
+    signals = RoutingSignals(input_chars=10_000, worker_type=WorkerType.SEARCH)
+    assert select_tier(signals) == ModelTier.FAST
+
+
+def test_complex_request_escalates_on_first_retry() -> None:
+    signals = RoutingSignals(worker_type=WorkerType.SEARCH, evaluator_failures=1)
+    assert select_tier(signals) == ModelTier.STRONG
+
+
+def test_simple_request_escalates_on_second_retry() -> None:
+    signals = RoutingSignals(worker_type=WorkerType.GENERAL, evaluator_failures=1)
+    assert select_tier(signals) == ModelTier.FAST
+    signals = RoutingSignals(worker_type=WorkerType.GENERAL, evaluator_failures=2)
+    assert select_tier(signals) == ModelTier.STRONG
+
+
+def test_per_agent_pin_overrides_router(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_MODEL_EVALUATOR", "pinned-eval")
+    signals = RoutingSignals(evaluator_failures=5)
+    assert select_model("evaluator", signals) == "pinned-eval"
+    assert select_model("general_worker", RoutingSignals()) == model_router.DEFAULT_FAST_MODEL
+
+
+def test_frontline_and_orchestrator_stay_on_the_strong_tier(monkeypatch) -> None:
+    signals = RoutingSignals(input_chars=10)
+    assert select_model("frontline", signals) == model_router.DEFAULT_STRONG_MODEL
+    assert select_model("orchestrator", signals) == model_router.DEFAULT_STRONG_MODEL
+    monkeypatch.setenv("OPENAI_MODEL_FRONTLINE", "pinned-frontline")
+    assert select_model("frontline", signals) == "pinned-frontline"
+
+
+def test_global_model_pins_every_agent(monkeypatch) -> None:
+    monkeypatch.setenv("OPENAI_MODEL", "legacy-model")
+    for name in model_router.AGENT_NAMES:
+        assert model_router.default_model(name) == "legacy-model"
+
+
+def test_tier_models_are_read_at_call_time(monkeypatch) -> None:
+    # .env is loaded after this module is imported, so tiers must not be cached
+    monkeypatch.setenv("OPENAI_MODEL_FAST", "fast-x")
+    monkeypatch.setenv("OPENAI_MODEL_STRONG", "strong-x")
+    assert select_model("general_worker", RoutingSignals()) == "fast-x"
+    assert select_model("general_worker", RoutingSignals(evaluator_failures=2)) == "strong-x"
+    assert select_model("orchestrator", RoutingSignals()) == "strong-x"
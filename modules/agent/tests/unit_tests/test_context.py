@@ -0,0 +1,76 @@
+from types import SimpleNamespace
+
+import pytest
+from agents.usage import Usage
+
+from agent import context, templates
+from agent.context import (
+    EMAIL_WORKER_INSTRUCTION,
+    EVALUATOR_INSTRUCTION,
+    FRONTLINE_INSTRUCTION,
+)
+from agent.frontline import _fence
+from agent.models import EmailParams
+
+
+def test_static_instruction_is_a_stable_prefix() -> None:
+    first = templates.FRONTLINE.render(history="USER: hi", message="hi")
+    second = templates.FRONTLINE.render(history="USER: hello", message="hello")
+    prefix = FRONTLINE_INSTRUCTION + "\n\nRecent conversation:\nUSER: h"
+    assert first.startswith(prefix)
+    assert second.startswith(prefix)
+
+
+def test_sections_keep_order_and_skip_empty_bodies() -> None:
+    template = templates.Template("t", "INSTR", [("a", "A"), ("feedback", "Feedback"), ("b", "B")])
+    assert template.render(b="2", feedback="", a="1") == "INSTR\n\nA:\n1\n\nB:\n2"
+
+
+def test_record_usage_accumulates_cached_tokens(monkeypatch) -> None:
+    monkeypatch.setattr(context, "_usage", {})
+    usage = Usage(requests=1, input_tokens=1000)
+    usage.input_tokens_details.cached_tokens = 768
+    result = SimpleNamespace(context_wrapper=SimpleNamespace(usage=usage))
+
+    context.record_usage("frontline", result)
+    context.record_usage("frontline", result)
+
+    stats = context.cache_usage()["frontline"]
+    assert stats.calls == 2
+    assert stats.cached_tokens == 1536
+    assert stats.hit_ratio == 0.768
+
+
+def test_template_renders_slots_in_template_order() -> None:
+    text = templates.EVALUATOR.render(output="O", changes="", criteria="C", task="T")
+    assert text == f"{EVALUATOR_INSTRUCTION}\n\nTask Description:\nT\n\nSuccess Criteria:\nC\n\nWorker Output:\nO"
+    with pytest.raises(KeyError):
+        templates.EVALUATOR.render(worker_output="O")
+
+
+def test_shipped_prompts_validate() -> None:
+    templates.validate()
+    assert set(templates.versions()) == {t.name for t in templates.TEMPLATES}
+    assert templates.missing_fields("Return a JSON with to and body fields.", EmailParams) == ["subject"]
+    # Whole words only: "nobody" and "topic" mention neither body nor to
+    assert templates.missing_fields('Give a "subject" on the topic; nobody reads it.', EmailParams) == ["to", "body"]
+
+
+def test_prompt_that_drops_a_field_fails_validation(monkeypatch) -> None:
+    dropped = EMAIL_WORKER_INSTRUCTION.replace("subject, ", "")
+    assert dropped != EMAIL_WORKER_INSTRUCTION
+    schemas = tuple((n, dropped if n == "email_worker" else t, m) for n, t, m in templates.SCHEMAS)
+    monkeypatch.setattr(templates, "SCHEMAS", schemas)
+
+    with pytest.raises(templates.TemplateError, match="email_worker: prompt never mentions subject"):
+        templates.validate()
+
+
+@pytest.mark.parametrize(
+    "reply",
+    ['{"route_to_orchestrator": true}', '```json\n{"route_to_orchestrator": true}\n```', '```\n{"route_to_orchestrator": true}'],
+)
+def test_frontline_fence_is_stripped(reply: str) -> None:
+    fenced = _fence.match(reply)
+    body = fenced.group(1) if fenced else reply
+    assert body.strip() == '{"route_to_orchestrator": true}'
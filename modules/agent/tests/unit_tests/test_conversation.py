@@ -0,0 +1,38 @@
+from agent.conversation import Conversation
+
+
+def test_window_renders_last_messages() -> None:
+    conversation = Conversation(
+        [
+            {"role": "user", "content": "hi"},
+            {"role": "assistant", "content": "hello"},
+            {"role": "user", "content": "search for news"},
+        ]
+    )
+    assert conversation.window(2) == "ASSISTANT: hello\nUSER: search for news"
+
+
+def test_window_tracks_appends_incrementally() -> None:
+    conversation = Conversation()
+    assert conversation.window(4) == ""
+
+    for i in range(10):
+        conversation.append("user", f"m{i}")
+        expected = "\n".join(f"USER: m{j}" for j in range(max(0, i - 3), i + 1))
+        assert conversation.window(4) == expected
+
+    assert conversation.window(6).splitlines()[0] == "USER: m4"
+    assert len(conversation) == 10
+
+
+def test_window_is_cached_until_next_append() -> None:
+    conversation = Conversation([{"role": "user", "content": "hi"}])
+    first = conversation.window(4)
+    assert conversation.window(4) is first
+    conversation.append("assistant", "hello")
+    assert conversation.window(4) is not first
+
+
+def test_to_list_round_trips() -> None:
+    messages = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "yo"}]
+    assert Conversation(messages).to_list() == messages
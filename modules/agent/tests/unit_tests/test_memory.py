@@ -0,0 +1,98 @@
+import json
+import logging
+import logging.handlers
+import queue
+import tracemalloc
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import memory, profiling
+from agent import runs as runs_module
+from agent.conversation import Conversation
+from agent.runs import RunRegistry
+from agent.server import app
+
+HEADERS = {"X-Debug-Token": "secret"}
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(profiling, "DEBUG_TOKEN", "secret")
+    monkeypatch.setattr(runs_module, "runs", RunRegistry())
+    monkeypatch.setattr("agent.server.runs", runs_module.runs)
+
+
+def test_conversation_nbytes_grows_with_messages() -> None:
+    conversation = Conversation()
+    empty = conversation.nbytes()
+    conversation.append("user", "x" * 1000)
+    conversation.window(4)
+    assert conversation.nbytes() > empty + 2000
+
+
+def test_memory_endpoint_requires_token(admin) -> None:
+    with TestClient(app) as client:
+        assert client.get("/admin/memory").status_code == 403
+        assert client.get("/admin/memory", headers={"X-Debug-Token": "no"}).status_code == 403
+
+
+def test_memory_endpoint_reports_subsystems(offline, admin) -> None:
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"uuid": "u1", "message": "hello"}))
+            while json.loads(ws.receive_text()) != {"on_chat_model_end": True}:
+                pass
+            during = client.get("/admin/memory", headers=HEADERS).json()
+        after = client.get("/admin/memory", headers=HEADERS).json()
+
+    assert during["websockets"] == 1
+    assert after["websockets"] == 0
+    assert after["conversations"]["count"] == 1
+    assert after["conversations"]["messages"] == 2
+    assert after["runs"]["count"] == 1
+    assert after["caches"]["workers"]["registered"] > 0
+    assert all("mb" in cache for cache in after["caches"].values())
+    assert after["tracemalloc"] == {"snapshots": 0}
+
+
+@pytest.mark.anyio
+async def test_snapshot_monitor_diffs_over_time() -> None:
+    monitor = memory.SnapshotMonitor()
+    profiling.start_tracing()
+    try:
+        await monitor.take()
+        leak = [bytearray(1024) for _ in range(200)]  # noqa: F841
+        await monitor.take()
+        report = monitor.report(top=5)
+    finally:
+        profiling.stop_tracing()
+
+    assert report["snapshots"] == 2
+    assert len(report["top_sites"]) == 5
+    assert any("test_memory.py" in site["site"] for site in report["growth_since_previous"])
+    assert not tracemalloc.is_tracing()
+
+
+def test_server_runs_monitor_when_enabled(offline, admin, monkeypatch) -> None:
+    monkeypatch.setattr(memory, "SNAPSHOT_INTERVAL", 3600)
+    with TestClient(app) as client:
+        report = client.get("/admin/memory?snapshot=1&top=5", headers=HEADERS).json()["tracemalloc"]
+
+    assert report["snapshots"] >= 1
+    assert len(report["top_sites"]) == 5
+    assert not tracemalloc.is_tracing()
+
+
+def test_logging_counts_records_queued_for_a_listener() -> None:
+    records: queue.Queue[logging.LogRecord] = queue.Queue()
+    log = logging.getLogger("test_memory.queued")
+    handler = logging.handlers.QueueHandler(records)
+    log.addHandler(handler)
+    try:
+        before = memory._logging()["buffered_records"]
+        log.warning("one")
+        log.warning("two")
+        assert memory._logging()["buffered_records"] == before + 2
+    finally:
+        log.removeHandler(handler)
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import profiling, store
+from agent import runs as runs_module
+from agent.runs import RunRegistry
+from agent.server import app
+from agent.store import SQLiteStore
+
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    monkeypatch.setattr(profiling, "DEBUG_TOKEN", "secret")
+    monkeypatch.setattr(runs_module, "runs", RunRegistry())
+    monkeypatch.setattr("agent.server.runs", runs_module.runs)
+
+
+def _frames(client, payload, last):
+    with client.websocket_connect("/ws") as ws:
+        ws.send_text(json.dumps(payload))
+        frames = [json.loads(ws.receive_text())]
+        while last not in frames[-1]:
+            frames.append(json.loads(ws.receive_text()))
+    return frames
+
+
+def test_authorized_requires_configured_token(monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "DEBUG_TOKEN", None)
+    assert not profiling.authorized("")
+    monkeypatch.setattr(profiling, "DEBUG_TOKEN", "secret")
+    assert profiling.authorized("secret")
+    assert not profiling.authorized("wrong")
+    assert not profiling.authorized(None)
+
+
+def test_debug_frame_reports_stages_cpu_and_allocations(offline, debug_token, caplog) -> None:
+    with TestClient(app) as client:
+        frames = _frames(client, {"uuid": "u1", "message": "search for AI news", "debug": "secret"}, "debug")
+
+    assert '"debug": "***"' in caplog.text
+    assert "secret" not in caplog.text
+
+    assert {"on_chat_model_end": True} in frames
+    report = frames[-1]["debug"]
+    assert {"frontline", "route", "worker", "evaluator"} <= set(report["stages_ms"])
+    assert report["wall_ms"] > 0
+    assert "top_stacks" in report["cpu"]
+    assert isinstance(report["allocations"], list)
+
+
+def test_unauthorized_debug_flag_is_ignored(offline, debug_token) -> None:
+    with TestClient(app) as client:
+        _frames(client, {"uuid": "u1", "message": "hello", "debug": "guess"}, "on_chat_model_end")
+
+    assert not any("debug" in json.loads(f) for f in runs_module.runs.get("u1").frames)
+
+
+def test_report_can_go_to_a_file(offline, debug_token, monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with TestClient(app) as client:
+        frames = _frames(client, {"uuid": "u1", "message": "hello", "debug": "secret"}, "debug")
+
+    path = frames[-1]["debug"]["profile_file"]
+    assert "stages_ms" in json.loads(open(path).read())
+
+
+def test_profile_file_names_stay_inside_the_directory(monkeypatch, tmp_path) -> None:
+    directory = tmp_path / "p"
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(directory))
+
+    paths = [Path(profiling.deliver({}, uid)["profile_file"]) for uid in ("../../x", "a/b", "a/b", None)]
+
+    assert all(path.parent == directory for path in paths)
+    assert len(set(paths)) == 4
+    assert list(tmp_path.iterdir()) == [directory]
+
+
+@pytest.mark.anyio
+async def test_failed_profile_write_becomes_an_error_frame(offline, debug_token, monkeypatch, tmp_path) -> None:
+    blocked = tmp_path / "file"
+    blocked.write_text("")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(blocked / "p"))  # parent is a file
+
+    registry = RunRegistry()
+    run = await registry.start("u1", "hello", profile=True)
+    await asyncio.gather(*registry._tasks)
+
+    assert run.done
+    assert "Failed to write profile" in json.loads(run.frames[-1])["debug"]["error"]
+
+
+@pytest.mark.anyio
+async def test_profiled_run_is_saved_for_other_workers(offline, debug_token, tmp_path) -> None:
+    store.set_store(SQLiteStore(tmp_path / "agent.db"))
+    try:
+        registry = RunRegistry()
+        run = await registry.start("u1", "hello", profile=True)
+        await asyncio.gather(*registry._tasks)
+        resumed = await RunRegistry().find("u1")
+    finally:
+        store.set_store(None)
+
+    assert resumed is not None and resumed.frames == run.frames
+    assert "debug" in json.loads(run.frames[-1])
@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from agent import backends
+from agent.fakes import FakeSearchBackend, FakeSettings, LatencyProfile
+from agent.retrieval import canonical_url, expand_queries, fan_out, merge, pack, rank
+
+pytestmark = pytest.mark.anyio
+
+
+def test_canonical_url_ignores_tracking_and_cosmetic_differences() -> None:
+    assert (
+        canonical_url("https://www.Example.com/a/?utm_source=x&b=2&a=1#top")
+        == canonical_url("http://example.com/a?a=1&b=2")
+    )
+    assert canonical_url("https://example.com/a?page=2") != canonical_url("https://example.com/a")
+
+
+def test_expand_queries_are_distinct_and_use_feedback() -> None:
+    queries = expand_queries("Research the history of chess", "history of chess")
+    assert queries[0] == "history of chess"
+    assert len(queries) == len({q.lower() for q in queries})
+
+    retry = expand_queries("Research the history of chess", "history of chess", "Missing openings detail")
+    assert any("openings" in q for q in retry)
+
+
+def test_merge_and_rank_prefer_relevant_agreed_results() -> None:
+    a = {"title": "Cooking", "link": "https://a.com/x", "snippet": "Pasta recipes."}
+    b = {"title": "Chess history", "link": "https://b.com/chess", "snippet": "Origins of chess."}
+    c = {"title": "Chess", "link": "https://b.com/chess/?utm_medium=x", "snippet": "Chess."}
+
+    merged, hits = merge([[a, b], [c]])
+
+    assert merged == [a, b]
+    assert rank(merged, "history of chess", hits) == [b, a]
+
+
+def test_pack_respects_budget() -> None:
+    results = [{"title": f"t{i}", "link": "https://x.com", "snippet": "word " * 40} for i in range(10)]
+    packed = pack(results, budget=120)
+    assert 0 < len(packed) // 4 <= 120
+    assert packed.startswith("1. t0")
+    assert "t9" not in packed
+
+
+async def test_fan_out_runs_queries_concurrently() -> None:
+    backends.set_search_backend(FakeSearchBackend(FakeSettings(search_latency=LatencyProfile(median=0.2))))
+    try:
+        start = time.perf_counter()
+        results = await fan_out(["a", "b", "c", "d"], 3)
+        elapsed = time.perf_counter() - start
+    finally:
+        backends.set_search_backend(None)
+
+    assert [len(r) for r in results] == [3, 3, 3, 3]
+    assert elapsed < 0.6
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agent import runs as runs_module
+from agent.runs import RunRegistry
+from agent.server import app
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_follow_replays_from_offset(offline) -> None:
+    registry = RunRegistry()
+    run = await registry.start("u1", "search for the latest AI news")
+
+    first = []
+    async for frame in run.follow():
+        first.append(frame)
+        break  # client drops after the first frame
+
+    rest = [frame async for frame in registry.get("u1").follow(offset=1)]
+
+    assert json.loads(first[0]) == {"on_chat_model_stream": "Processing your request..."}
+    assert json.loads(rest[-1]) == {"on_chat_model_end": True}
+    assert first + rest == run.frames
+
+
+async def test_finished_runs_are_bounded(offline) -> None:
+    registry = RunRegistry(max_runs=2)
+    for i in range(4):
+        run = await registry.start(f"u{i}", "hello")
+        async for _ in run.follow():
+            pass
+
+    assert len(registry) == 2
+    assert registry.get("u0") is None
+    assert registry.get("u3") is not None
+
+
+def test_reconnect_resumes_by_uuid(offline, monkeypatch) -> None:
+    monkeypatch.setattr(runs_module, "runs", RunRegistry())
+    monkeypatch.setattr("agent.server.runs", runs_module.runs)
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"uuid": "u1", "message": "search for AI news"}))
+            first = ws.receive_text()
+
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"uuid": "u1", "resume": True, "offset": 1}))
+            frames = [first]
+            while json.loads(frames[-1]) != {"on_chat_model_end": True}:
+                frames.append(ws.receive_text())
+
+        with client.websocket_connect("/ws") as ws:
+            ws.send_text(json.dumps({"uuid": "nobody", "resume": True}))
+            assert "resume_error" in json.loads(ws.receive_text())
+            # A bad offset is refused without dropping the socket
+            ws.send_text(json.dumps({"uuid": "u1", "resume": True, "offset": "two"}))
+            assert json.loads(ws.receive_text()) == {"resume_error": "Invalid offset"}
+            ws.send_text(json.dumps({"uuid": "u1", "resume": True, "offset": len(frames) - 1}))
+            assert json.loads(ws.receive_text()) == {"on_chat_model_end": True}
+
+    assert frames == runs_module.runs.get("u1").frames
+
+
+def test_sse_streams_same_frames_as_ws(offline, monkeypatch) -> None:
+    monkeypatch.setattr(runs_module, "runs", RunRegistry())
+    monkeypatch.setattr("agent.server.runs", runs_module.runs)
+
+    with TestClient(app) as client:
+        response = client.post("/chat", json={"uuid": "u1", "message": "search for AI news"})
+        resumed = client.get("/chat/u1", headers={"Last-Event-ID": "2"})
+        missing = client.get("/chat/nobody")
+
+    events = [e.split("\n") for e in response.text.strip().split("\n\n")]
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [e[0] for e in events] == [f"id: {i}" for i in range(1, len(events) + 1)]
+    assert [e[1].removeprefix("data: ") for e in events] == runs_module.runs.get("u1").frames
+    assert resumed.text.startswith("id: 3\n")
+    assert missing.status_code == 404
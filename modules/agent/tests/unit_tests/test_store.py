@@ -0,0 +1,119 @@
+import asyncio
+import threading
+
+import pytest
+
+from agent import runner, store
+from agent import runs as runs_module
+from agent.runs import RunRegistry
+from agent.store import SQLiteStore, open_store
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def shared(tmp_path):
+    shared = SQLiteStore(tmp_path / "agent.db")
+    store.set_store(shared)
+    yield shared
+    store.set_store(None)
+
+
+def test_concurrent_appends_get_unique_sequence_numbers(tmp_path) -> None:
+    path = tmp_path / "agent.db"
+    seqs: list[int] = []
+
+    def writer(n: int) -> None:
+        worker = SQLiteStore(path)  # one store per "process"
+        for i in range(25):
+            seqs.append(worker._append("c1", "user", f"{n}-{i}"))
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(seqs) == list(range(1, 101))
+    assert [row[0] for row in SQLiteStore(path)._load("c1", 90)] == list(range(91, 101))
+
+
+async def test_conversation_continues_on_another_worker(offline, shared, socket) -> None:
+    await runner.handle_chat(socket, "hello", "u1")
+
+    runner._conversations.clear()  # a different worker process
+    await runner.handle_chat(socket, "and again", "u1")
+
+    assert [m.content for m in runner._conversations["u1"]][::2] == ["hello", "and again"]
+    assert len(await shared.load("u1")) == 4
+
+
+async def test_finished_run_resumes_on_another_worker(offline, shared) -> None:
+    registry = RunRegistry()
+    run = await registry.start("u1", "hello")
+    await asyncio.gather(*registry._tasks)
+
+    resumed = await RunRegistry().find("u1")
+
+    assert resumed is not None and resumed.done
+    assert resumed.frames == run.frames
+    assert await RunRegistry().find("nobody") is None
+
+
+async def test_failed_run_save_is_logged_not_raised(offline, shared, monkeypatch, caplog) -> None:
+    async def broken(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(shared, "save_run", broken)
+    registry = RunRegistry()
+    run = await registry.start("u1", "hello")
+    await asyncio.gather(*registry._tasks)
+
+    assert run.done and registry.get("u1") is run
+    assert "disk full" in caplog.text
+
+
+async def test_in_flight_run_hides_the_previous_one_from_other_workers(offline, shared, monkeypatch) -> None:
+    worker_a, worker_b = RunRegistry(), RunRegistry()
+    await worker_a.start("u1", "hello first")
+    await asyncio.gather(*worker_a._tasks)
+    assert (await worker_b.find("u1")) is not None
+
+    release = asyncio.Event()
+    handle_chat = runs_module.handle_chat
+
+    async def slow(socket, data, user_uuid):
+        await release.wait()
+        await handle_chat(socket, data, user_uuid)
+
+    monkeypatch.setattr(runs_module, "handle_chat", slow)
+    second = await worker_a.start("u1", "hello second")
+
+    assert await worker_b.find("u1") is None  # in flight on worker A only
+
+    release.set()
+    await asyncio.gather(*worker_a._tasks)
+    assert (await worker_b.find("u1")).frames == second.frames
+
+
+def test_stale_save_does_not_replace_a_newer_run(shared) -> None:
+    shared._begin_run("u1", "old", 60)
+    shared._begin_run("u1", "new", 60)
+    shared._save_run("u1", "old", ["stale"], 60)
+    assert shared._load_run("u1") is None
+
+    shared._save_run("u1", "new", ["fresh"], 60)
+    assert shared._load_run("u1") == ["fresh"]
+
+
+def test_expired_runs_are_purged_on_save(shared) -> None:
+    shared._save_run("gone", "r1", ["x"], -1)
+    shared._save_run("kept", "r2", ["y"], 60)
+
+    rows = shared._db().execute("SELECT conversation FROM runs").fetchall()
+    assert rows == [("kept",)]
+
+
+def test_open_store_rejects_unknown_urls() -> None:
+    with pytest.raises(ValueError):
+        open_store("postgres://localhost/agent")
@@ -0,0 +1,124 @@
+import sys
+
+import pytest
+
+from agent import workers
+from agent.models import WorkerResult, WorkerType
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(autouse=True)
+def _isolated_registry(monkeypatch):
+    monkeypatch.setattr(workers, "_workers", dict(workers._workers))
+    monkeypatch.setattr(workers, "_loaded", {})
+
+
+def test_registry_targets_are_not_imported_eagerly() -> None:
+    assert all(isinstance(t, str) for t in workers._workers.values())
+    assert workers._loaded == {}
+
+
+def test_load_worker_imports_target() -> None:
+    worker_fn = workers.load_worker(WorkerType.GENERAL)
+    assert worker_fn is sys.modules["agent.workers.general_worker"].execute
+    assert workers.load_worker(WorkerType.GENERAL) is worker_fn
+
+
+async def test_execute_registered_worker() -> None:
+    async def echo(task_description, parameters, feedback=None, failures=0):
+        return WorkerResult(success=True, output=f"{task_description}:{failures}")
+
+    workers.register_worker("ECHO", echo)
+    result = await workers.execute_worker("ECHO", "hi", {}, failures=2)
+    assert result.output == "hi:2"
+
+
+async def test_unknown_worker_is_reported() -> None:
+    result = await workers.execute_worker("MISSING", "hi", {})
+    assert not result.success
+    assert "MISSING" in result.error
+
+
+async def test_state_is_passed_only_to_workers_that_accept_it() -> None:
+    async def stateful(task_description, parameters, feedback=None, failures=0, state=None):
+        return WorkerResult(success=True, output=str(state), state={"n": (state or {}).get("n", 0) + 1})
+
+    async def stateless(task_description, parameters, feedback=None, failures=0):
+        return WorkerResult(success=True, output="ok")
+
+    workers.register_worker("STATEFUL", stateful)
+    workers.register_worker("STATELESS", stateless)
+
+    assert (await workers.execute_worker("STATEFUL", "t", {}, state={"n": 1})).state == {"n": 2}
+    assert (await workers.execute_worker("STATELESS", "t", {}, state={"n": 1})).output == "ok"
+
+
+def test_output_diff_only_when_smaller() -> None:
+    from agent.evaluator import output_diff
+
+    previous = "Chess began in India. " * 20 + "It spread to Persia."
+    revised = "Chess began in India. " * 20 + "It spread to Persia and Europe."
+    assert "+It spread to Persia and Europe." in output_diff(previous, revised)
+    assert output_diff("Short.", "Completely different.") is None
+    assert output_diff(revised, revised) is None
+
+
+async def test_commit_is_passed_only_to_workers_that_accept_it() -> None:
+    async def deferring(task_description, parameters, feedback=None, failures=0, state=None, commit=False):
+        return WorkerResult(success=True, output="sent" if commit else "draft", deferred=not commit)
+
+    async def immediate(task_description, parameters, feedback=None, failures=0):
+        return WorkerResult(success=True, output="done")
+
+    workers.register_worker("DEFERRING", deferring)
+    workers.register_worker("IMMEDIATE", immediate)
+
+    assert (await workers.execute_worker("DEFERRING", "t", {})).deferred
+    assert (await workers.execute_worker("DEFERRING", "t", {}, commit=True)).output == "sent"
+    assert (await workers.execute_worker("IMMEDIATE", "t", {}, commit=True)).output == "done"
+
+
+async def test_email_retry_never_rewrites_recipient_or_pinned_fields(offline, monkeypatch) -> None:
+    from agent import backends
+    from agent.workers import email_worker
+
+    async def compose(*args):
+        return {"to": "mallory@example.com", "subject": "New subject", "body": "New body"}
+
+    monkeypatch.setattr(email_worker, "_compose", compose)
+    draft = {"to": "bob@example.com", "subject": "Old subject", "body": "Pinned body"}
+
+    result = await email_worker.execute(
+        "Send an email",
+        {"body": "Pinned body"},
+        feedback="Wrong recipient address, and the subject is vague.",
+        state={"email": draft},
+    )
+
+    assert result.deferred
+    assert result.state["email"] == {**draft, "subject": "New subject"}
+    assert backends.get_email_backend().sent == []
+
+
+async def test_evaluator_always_gets_the_full_output(offline) -> None:
+    from agent.evaluator import evaluate
+
+    provider = offline()
+    inputs = []
+    respond = provider.respond
+
+    def recording(text):
+        inputs.append(text)
+        return respond(text)
+
+    provider.respond = recording
+    previous = "Chess began in India. " * 20 + "It spread to Persia."
+    revised = "Chess began in India. " * 20 + "It spread to Persia and Europe."
+
+    await evaluate(revised, "Research chess", "Accurate", previous_output=previous, previous_feedback="Too short.")
+
+    (text,) = inputs
+    assert "Worker Output:\n" + revised in text
+    assert "Changes since the previous attempt" in text
+    assert "+It spread to Persia and Europe." in text